@@ -1,6 +1,9 @@
+import uuid
+
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from .models import CustomUser, Wallet, Transaction
+from .changelist import LargeTableAdmin
 
 class CustomUserAdmin(UserAdmin):
     model = CustomUser
@@ -24,17 +27,55 @@ admin.site.register(CustomUser, CustomUserAdmin)
 
 from .models import Wallet
 
+
+def owners_with_email(email):
+    # Resolved up front so the outer query filters on the indexed user id
+    # rather than joining users for every row.
+    return list(CustomUser.objects.filter(email__iexact=email).values_list('id', flat=True))
+
+
 @admin.register(Wallet)
-class WalletAdmin(admin.ModelAdmin):
+class WalletAdmin(LargeTableAdmin):
     list_display = ('user', 'wallet_number', 'balance')
-    search_fields = ('user__email', 'wallet_number')
+    list_select_related = ('user',)
+    # Documents what get_search_results matches; every lookup is indexed.
+    search_fields = ('=wallet_number', '=user__email')
+    search_help_text = 'Exact wallet number or owner email.'
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if '@' in term:
+            return queryset.filter(user__in=owners_with_email(term)), False
+        return queryset.filter(wallet_number=term), False
 
 
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(LargeTableAdmin):
     list_display = ('transaction_id', 'sender', 'receiver_name', 'receiver_account_number', 'amount', 'timestamp')
-    search_fields = ('transaction_id', 'sender__email', 'receiver_name', 'receiver_account_number')
-    list_filter = ('timestamp',)
+    # Both users are needed: the row checkbox label is str(transaction).
+    list_select_related = ('sender', 'receiver')
+    search_fields = ('=transaction_id', '=sender__email', '=receiver_account_number', '^receiver_name')
+    search_help_text = 'Exact transaction ID, sender email or account number, or the start of the receiver name.'
+    date_hierarchy = 'timestamp'
     ordering = ('-timestamp',)
+    cursor_ordering = ('-timestamp', '-pk')
+
+    def get_search_results(self, request, queryset, search_term):
+        # One indexed lookup chosen by the shape of the term, rather than
+        # an OR of LIKE '%term%' across joined columns.
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        try:
+            return queryset.filter(transaction_id=uuid.UUID(term)), False
+        except ValueError:
+            pass
+        if '@' in term:
+            return queryset.filter(sender__in=owners_with_email(term)), False
+        if term.isdigit():
+            return queryset.filter(receiver_account_number=term), False
+        return queryset.filter(receiver_name__istartswith=term), False
 
 
@@ -0,0 +1,197 @@
+"""
+Transparent compression for chat transcripts.
+
+Compressed values start with a four byte header: a NUL marker, a codec tag
+and the big-endian id of the ``CompressionDictionary`` used (0 for none).
+Anything without the marker is legacy plain text and is returned as-is, so
+rows written before compression was enabled stay readable.
+
+zstd is used when the optional ``zstandard`` package is installed, zlib with a
+preset dictionary otherwise.
+"""
+import threading
+import time
+import zlib
+from collections import Counter
+
+from django.conf import settings
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MARKER = b'\x00'
+RAW = b'r'
+ZLIB = b'z'
+ZSTD = b's'
+HEADER_SIZE = 4
+
+ZLIB_WINDOW = 32 * 1024
+
+_lock = threading.Lock()
+_dictionaries = {}
+_zstd_dictionaries = {}
+_active = {}
+
+
+def codec_name():
+    codec = settings.CHAT_COMPRESSION_CODEC
+    if codec == 'zstd' and zstandard is None:
+        return 'zlib'
+    return codec
+
+
+def _dictionary(dict_id):
+    # Dictionaries are immutable once trained, so they are cached forever.
+    if dict_id not in _dictionaries:
+        from .models import CompressionDictionary
+        data = CompressionDictionary.objects.values_list('data', flat=True).get(pk=dict_id)
+        with _lock:
+            _dictionaries[dict_id] = bytes(data)
+    return _dictionaries[dict_id]
+
+
+def _zstd_dictionary(dict_id):
+    if dict_id not in _zstd_dictionaries:
+        dictionary = zstandard.ZstdCompressionDict(_dictionary(dict_id))
+        dictionary.precompute_compress(level=settings.CHAT_COMPRESSION_LEVEL)
+        with _lock:
+            _zstd_dictionaries[dict_id] = dictionary
+    return _zstd_dictionaries[dict_id]
+
+
+def active_dictionary_id(codec):
+    """Id of the newest dictionary for ``codec``, re-checked every few minutes."""
+    now = time.monotonic()
+    cached = _active.get(codec)
+    if cached is None or now - cached[1] > settings.CHAT_COMPRESSION_DICTIONARY_TTL:
+        from .models import CompressionDictionary
+        dict_id = (
+            CompressionDictionary.objects.filter(codec=codec).order_by('-id').values_list('id', flat=True).first()
+        )
+        cached = (dict_id or 0, now)
+        _active[codec] = cached
+    return cached[0]
+
+
+def compress(text, codec=None, dict_id=None):
+    data = text.encode('utf-8')
+    if len(data) < settings.CHAT_COMPRESSION_MIN_SIZE:
+        return MARKER + RAW + b'\x00\x00' + data
+    codec = codec or codec_name()
+    if dict_id is None:
+        dict_id = active_dictionary_id(codec)
+    if codec == 'zstd':
+        compressor = zstandard.ZstdCompressor(
+            level=settings.CHAT_COMPRESSION_LEVEL,
+            dict_data=_zstd_dictionary(dict_id) if dict_id else None,
+        )
+        payload = compressor.compress(data)
+        tag = ZSTD
+    else:
+        if dict_id:
+            compressor = zlib.compressobj(settings.CHAT_COMPRESSION_LEVEL, zdict=_dictionary(dict_id))
+        else:
+            compressor = zlib.compressobj(settings.CHAT_COMPRESSION_LEVEL)
+        payload = compressor.compress(data) + compressor.flush()
+        tag = ZLIB
+    return MARKER + tag + dict_id.to_bytes(2, 'big') + payload
+
+
+def decompress(value):
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    if len(value) < HEADER_SIZE or value[:1] != MARKER:
+        return value.decode('utf-8')
+    tag = value[1:2]
+    dict_id = int.from_bytes(value[2:HEADER_SIZE], 'big')
+    payload = value[HEADER_SIZE:]
+    if tag == RAW:
+        data = payload
+    elif tag == ZSTD:
+        if zstandard is None:
+            raise RuntimeError('zstandard is required to read zstd-compressed chat messages.')
+        decompressor = zstandard.ZstdDecompressor(dict_data=_zstd_dictionary(dict_id) if dict_id else None)
+        data = decompressor.decompress(payload)
+    elif tag == ZLIB:
+        decompressor = zlib.decompressobj(zdict=_dictionary(dict_id)) if dict_id else zlib.decompressobj()
+        data = decompressor.decompress(payload) + decompressor.flush()
+    else:
+        raise ValueError(f'Unknown chat compression codec {tag!r}.')
+    return data.decode('utf-8')
+
+
+def train_dictionary(samples, codec, size):
+    """Build a compression dictionary of at most ``size`` bytes from ``samples``."""
+    encoded = [sample.encode('utf-8') for sample in samples if sample]
+    if codec == 'zstd':
+        try:
+            return zstandard.train_dictionary(size, encoded).as_bytes()
+        except zstandard.ZstdError:
+            # Too few samples to train on; zstd accepts raw-content dictionaries.
+            pass
+    else:
+        size = min(size, ZLIB_WINDOW)
+
+    # Pack the most common lines, most frequent last because matches nearer
+    # the end of a raw dictionary are cheaper to encode.
+    counts = Counter(line for sample in encoded for line in sample.splitlines(keepends=True) if len(line) > 8)
+    chunks = []
+    total = 0
+    for line, count in counts.most_common():
+        if count < 2 or total + len(line) > size:
+            continue
+        chunks.append(line)
+        total += len(line)
+    return b''.join(reversed(chunks))
+
+
+class CompressedTextDescriptor(DeferredAttribute):
+    """Decompress on first access and keep the text for later reads."""
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, (bytes, memoryview)):
+            value = decompress(value)
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        # A data descriptor, so reads always pass through __get__.
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedTextField(models.BinaryField):
+    """
+    Text stored compressed. Values loaded from the database stay compressed
+    until the attribute is read, so listing or counting rows never pays for
+    decompression.
+    """
+    descriptor_class = CompressedTextDescriptor
+
+    def pre_save(self, model_instance, add):
+        # Skip the descriptor so unread values are saved without a round-trip.
+        return model_instance.__dict__.get(self.attname)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if isinstance(value, str):
+            value = compress(value)
+        return super().get_db_prep_value(value, connection, prepared)
+
+    def from_db_value(self, value, expression, connection):
+        # Legacy plain-text rows come back from SQLite as str.
+        if value is None or isinstance(value, str):
+            return value
+        return bytes(value)
+
+    def to_python(self, value):
+        return decompress(value)
+
+    def value_to_string(self, obj):
+        return getattr(obj, self.attname)
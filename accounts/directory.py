@@ -0,0 +1,59 @@
+"""
+Wallet number -> (user id, full name) directory for recipient verification.
+
+Entries live in the shared Django cache and are written through from the
+model signals when wallets are created or names change, so a verify is a
+single cache read. Unknown numbers are cached as misses for a short time so
+repeated lookups of a mistyped number don't reach the database either.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Wallet
+
+MISSING = 'missing'
+
+
+def _key(wallet_number):
+    return f'wallet-dir:{wallet_number}'
+
+
+def _load(wallet_numbers):
+    rows = Wallet.objects.filter(wallet_number__in=wallet_numbers).values_list(
+        'wallet_number', 'user_id', 'user__full_name',
+    )
+    return {number: (user_id, full_name) for number, user_id, full_name in rows}
+
+
+def lookup_many(wallet_numbers):
+    """Return ``{wallet_number: (user_id, full_name) or None}``."""
+    wallet_numbers = list(dict.fromkeys(wallet_numbers))
+    cached = cache.get_many([_key(number) for number in wallet_numbers])
+    results = {}
+    misses = []
+    for number in wallet_numbers:
+        entry = cached.get(_key(number))
+        if entry is None:
+            misses.append(number)
+        else:
+            results[number] = None if entry == MISSING else tuple(entry)
+    if misses:
+        found = _load(misses)
+        cache.set_many({_key(number): entry for number, entry in found.items()}, settings.WALLET_DIRECTORY_TTL)
+        missing = [number for number in misses if number not in found]
+        cache.set_many({_key(number): MISSING for number in missing}, settings.WALLET_DIRECTORY_NEGATIVE_TTL)
+        for number in misses:
+            results[number] = found.get(number)
+    return results
+
+
+def lookup(wallet_number):
+    return lookup_many([wallet_number])[wallet_number]
+
+
+def update(wallet_number, user_id, full_name):
+    cache.set(_key(wallet_number), (user_id, full_name), settings.WALLET_DIRECTORY_TTL)
+
+
+def forget(wallet_number):
+    cache.delete(_key(wallet_number))
@@ -0,0 +1,110 @@
+"""
+In-memory FX rate table for cross-currency transfers.
+
+Rates are loaded from ``settings.FX_RATES_FILE`` (a local file standing in
+for a rate feed) and refreshed by a background thread. A refresh builds a new
+immutable ``RateTable`` and swaps the module reference, so readers always see
+one complete, versioned table and never touch the file or the database.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal('0.01')
+RATE_PRECISION = Decimal('0.00000001')
+
+
+class UnsupportedCurrency(Exception):
+    pass
+
+
+class RateTable:
+    """Units of each currency per one unit of ``base``."""
+
+    def __init__(self, version, base, rates):
+        self.version = version
+        self.base = base
+        self.rates = rates
+
+    def __contains__(self, currency):
+        return currency in self.rates
+
+    def rate(self, source, target):
+        try:
+            return (self.rates[target] / self.rates[source]).quantize(RATE_PRECISION)
+        except KeyError as exc:
+            raise UnsupportedCurrency(exc.args[0])
+
+    def convert(self, amount, source, target):
+        """Return ``(converted_amount, rate)`` for ``amount`` in ``source``."""
+        if source == target:
+            return amount, Decimal(1)
+        rate = self.rate(source, target)
+        return (amount * rate).quantize(CENT, rounding=ROUND_HALF_UP), rate
+
+
+def load_table(path):
+    with open(path, 'rb') as rate_file:
+        raw = rate_file.read()
+    data = json.loads(raw)
+    rates = {currency: Decimal(str(rate)) for currency, rate in data['rates'].items()}
+    version = data.get('version') or hashlib.sha256(raw).hexdigest()[:16]
+    return RateTable(version, data.get('base', 'USD'), rates)
+
+
+_table = None
+_lock = threading.Lock()
+
+
+def get_table():
+    if _table is None:
+        with _lock:
+            if _table is None:
+                _install(load_table(settings.FX_RATES_FILE))
+                _start_refresher()
+    return _table
+
+
+def _install(table):
+    global _table
+    _table = table
+
+
+def refresh():
+    """Reload the rate file, swapping in the new table if its version changed."""
+    table = load_table(settings.FX_RATES_FILE)
+    if _table is None or table.version != _table.version:
+        _install(table)
+        logger.info('Loaded FX rate table %s', table.version)
+
+
+def _refresh_forever():
+    while True:
+        time.sleep(settings.FX_REFRESH_SECONDS)
+        try:
+            refresh()
+        except Exception:
+            # Keep serving the last good table until the feed recovers.
+            logger.exception('FX rate refresh failed')
+
+
+def _start_refresher():
+    threading.Thread(target=_refresh_forever, name='fx-refresh', daemon=True).start()
+
+
+def _restart_refresher_in_child():
+    # Threads don't survive fork(): a worker forked after the table was
+    # preloaded in the master needs a refresher of its own.
+    if _table is not None:
+        _start_refresher()
+
+
+os.register_at_fork(after_in_child=_restart_refresher_in_child)
@@ -0,0 +1,309 @@
+"""
+Synthetic data and traffic for the endpoint benchmarks.
+
+Everything here drives the real URL routes in-process through Django's test
+client, so timings include middleware, authentication, serialization and
+the database, but not network or WSGI server overhead.
+"""
+import json
+import random
+import statistics
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.contrib.auth.hashers import make_password
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import search
+from .models import ChatMessage, ChatSession, CustomUser, Transaction, Wallet
+
+BENCH_PASSWORD = 'bench-password-123'
+BENCH_PIN = '1234'
+
+DEFAULT_MIX = {'browse': 60, 'transfer': 25, 'chat': 10, 'auth': 5}
+
+# Words from the seeded transaction descriptions and chat messages.
+SEARCH_QUERIES = ['invoice payment', 'phytosanitary certificate', 'shea butter ghana', 'export']
+
+
+class SeededData:
+    def __init__(self, users, wallet_numbers, transaction_ids, session_ids):
+        self.users = users
+        self.wallet_numbers = wallet_numbers
+        self.transaction_ids = transaction_ids
+        self.session_ids = session_ids
+
+
+def seed(users=200, transactions=5000, sessions=200, messages_per_session=6, months=6, rng=None):
+    """Create synthetic users, wallets, transactions and chat sessions."""
+    rng = rng or random.Random(0)
+    run = uuid.uuid4().hex[:8]
+    password = make_password(BENCH_PASSWORD)
+
+    # bulk_create skips the post_save signal, so wallets are created here.
+    CustomUser.objects.bulk_create([
+        CustomUser(
+            email=f'bench-{run}-{i}@example.com',
+            password=password,
+            full_name=f'Bench Trader {i}',
+            phone_number='0800000000',
+            country='Nigeria',
+            business_type='business',
+            pin=BENCH_PIN,
+        )
+        for i in range(users)
+    ])
+    # Re-read so primary keys are set on backends that don't return them.
+    created = list(CustomUser.objects.filter(email__startswith=f'bench-{run}-').order_by('id'))
+    taken = set(Wallet.objects.values_list('wallet_number', flat=True))
+    numbers = (f'{n:06d}' for n in range(1000000) if f'{n:06d}' not in taken)
+    wallets = Wallet.objects.bulk_create([
+        Wallet(user=user, wallet_number=next(numbers), balance=Decimal('1000000.00')) for user in created
+    ])
+    wallet_numbers = {wallet.user_id: wallet.wallet_number for wallet in wallets}
+
+    now = timezone.now()
+    span = timedelta(days=30 * months).total_seconds()
+    transaction_ids = {user.id: [] for user in created}
+    batch = []
+    for _ in range(transactions):
+        sender, receiver = rng.sample(created, 2)
+        txn = Transaction(
+            sender=sender,
+            receiver=receiver,
+            amount=Decimal(rng.randint(100, 100000)) / 100,
+            receiver_name=receiver.full_name,
+            receiver_account_number=wallet_numbers[receiver.id],
+            description='Invoice payment',
+            timestamp=now - timedelta(seconds=rng.uniform(0, span)),
+        )
+        batch.append(txn)
+        transaction_ids[sender.id].append(txn.transaction_id)
+        transaction_ids[receiver.id].append(txn.transaction_id)
+    Transaction.objects.bulk_create(batch, batch_size=2000)
+
+    session_ids = {user.id: [] for user in created}
+    chat_sessions = [ChatSession(user=rng.choice(created), title='Export questions') for _ in range(sessions)]
+    ChatSession.objects.bulk_create(chat_sessions)
+    chat_sessions = ChatSession.objects.filter(session_id__in=[s.session_id for s in chat_sessions])
+    chat_messages = []
+    for chat_session in chat_sessions:
+        session_ids[chat_session.user_id].append(chat_session.session_id)
+        for i in range(messages_per_session):
+            role = 'user' if i % 2 == 0 else 'assistant'
+            content = 'How do I export shea butter to Ghana?' if role == 'user' else StubLLMServer.REPLY
+            chat_messages.append(ChatMessage(chat_session=chat_session, role=role, content=content))
+    ChatMessage.objects.bulk_create(chat_messages, batch_size=2000)
+
+    # bulk_create skips the post_save signals that index new rows for search.
+    documents = [
+        document
+        for txn in Transaction.objects.filter(sender__in=created).iterator()
+        for document in search.transaction_documents(txn)
+    ]
+    documents += [
+        document
+        for message in ChatMessage.objects.filter(chat_session__user__in=created).select_related('chat_session')
+        for document in search.message_documents(message, message.chat_session.user_id)
+    ]
+    search.add_documents(documents)
+
+    return SeededData(created, wallet_numbers, transaction_ids, session_ids)
+
+
+class StubLLMServer:
+    """A local stand-in for the OpenRouter chat completions API."""
+
+    REPLY = (
+        "1. Get a Certificate of Origin from the Nigerian Export Promotion Council.\n"
+        "2. Register on the Ghana Single Window portal and submit the import declaration.\n"
+        "3. Apply for a Phytosanitary Certificate before shipping.\n"
+    )
+
+    def __init__(self, delay=0.0):
+        reply = json.dumps({'choices': [{'message': {'role': 'assistant', 'content': self.REPLY}}]}).encode()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if delay:
+                    time.sleep(delay)
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/api/v1/chat/completions'
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class LoadRunner:
+    """Runs weighted scenarios and records per-endpoint timings and query counts."""
+
+    def __init__(self, data, rng=None):
+        self.data = data
+        self.rng = rng or random.Random(0)
+        self.client = Client()
+        self.tokens = {}
+        self.samples = {}
+
+    def _auth(self, user):
+        if user.id not in self.tokens:
+            self.tokens[user.id] = f'Bearer {RefreshToken.for_user(user).access_token}'
+        return self.tokens[user.id]
+
+    def call(self, name, method, path, user=None, data=None):
+        headers = {'HTTP_AUTHORIZATION': self._auth(user)} if user else {}
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            # Counted here rather than from connection.queries, which keeps
+            # only the last 9000 queries and so reads 0 on long runs.
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count))
+            started = time.perf_counter()
+            if method == 'get':
+                response = self.client.get(path, data or {}, **headers)
+            else:
+                response = self.client.post(path, data or {}, content_type='application/json', **headers)
+            elapsed = time.perf_counter() - started
+        sample = self.samples.setdefault(name, {'latencies': [], 'queries': [], 'errors': 0})
+        sample['latencies'].append(elapsed)
+        sample['queries'].append(queries)
+        if response.status_code >= 400:
+            sample['errors'] += 1
+        return response
+
+    def browse(self, user):
+        self.call('user-info', 'get', reverse('user-info'), user)
+        self.call('wallet-info', 'get', reverse('wallet-info'), user)
+        self.call('wallet-transactions', 'get', reverse('wallet-transactions'), user, {'months': 3})
+        transaction_ids = self.data.transaction_ids[user.id]
+        if transaction_ids:
+            transaction_id = self.rng.choice(transaction_ids)
+            self.call('wallet-transaction-detail', 'get',
+                      reverse('wallet-transaction-detail', args=[transaction_id]), user)
+        self.call('chatbot-sessions', 'get', reverse('chatbot-sessions'), user, {'months': 1})
+        self.call('search', 'get', reverse('search'), user, {'q': self.rng.choice(SEARCH_QUERIES)})
+
+    def transfer(self, user):
+        recipient = self.rng.choice(self.data.users)
+        while recipient.id == user.id:
+            recipient = self.rng.choice(self.data.users)
+        payload = {
+            'recipient_wallet_number': self.data.wallet_numbers[recipient.id],
+            'amount': '25.00',
+            'description': 'Load test',
+        }
+        self.call('wallet-transfer:verify', 'post', reverse('wallet-transfer'), user, {**payload, 'step': 'verify'})
+        self.call('wallet-transfer:transfer', 'post', reverse('wallet-transfer'), user,
+                  {**payload, 'step': 'transfer', 'pin': BENCH_PIN})
+        self.call('wallet-deposit', 'post', reverse('wallet-deposit'), user, {'amount': '25.00'})
+        numbers = [self.data.wallet_numbers[other.id] for other in self.rng.sample(self.data.users, 10)]
+        self.call('wallet-verify-batch', 'post', reverse('wallet-verify-batch'), user,
+                  {'wallet_numbers': numbers + ['999999']})
+
+    def chat(self, user):
+        data = {'prompt': 'What documents do I need to export cashew nuts to Kenya?'}
+        session_ids = self.data.session_ids[user.id]
+        if session_ids and self.rng.random() < 0.5:
+            data['session_id'] = str(self.rng.choice(session_ids))
+        self.call('chatbot', 'post', reverse('chatbot'), user, data)
+
+    def auth(self, user):
+        self.call('login', 'post', reverse('login'), data={'email': user.email, 'password': BENCH_PASSWORD})
+        email = f'bench-register-{uuid.uuid4().hex[:12]}@example.com'
+        self.call('register', 'post', reverse('register'), data={
+            'email': email,
+            'password': BENCH_PASSWORD,
+            'confirm_password': BENCH_PASSWORD,
+            'business_type': 'individual',
+            'full_name': 'Bench Registrant',
+            'phone_number': '0800000000',
+            'country': 'Kenya',
+            'state_province': 'Nairobi',
+            'preferred_language': 'English',
+            'language': 'English',
+            'pin': BENCH_PIN,
+            'voice_mode': False,
+            'enable_biometrics_login': False,
+        })
+
+    def run(self, iterations, mix):
+        scenarios = list(mix)
+        weights = [mix[name] for name in scenarios]
+        started = time.perf_counter()
+        for _ in range(iterations):
+            scenario = self.rng.choices(scenarios, weights)[0]
+            getattr(self, scenario)(self.rng.choice(self.data.users))
+        return time.perf_counter() - started
+
+
+def _percentile(ordered, fraction):
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(samples, elapsed):
+    endpoints = {}
+    for name, sample in sorted(samples.items()):
+        latencies = sorted(sample['latencies'])
+        endpoints[name] = {
+            'requests': len(latencies),
+            'errors': sample['errors'],
+            'throughput_rps': len(latencies) / sum(latencies),
+            'p50_ms': _percentile(latencies, 0.50) * 1000,
+            'p95_ms': _percentile(latencies, 0.95) * 1000,
+            'p99_ms': _percentile(latencies, 0.99) * 1000,
+            'mean_queries': statistics.mean(sample['queries']),
+            'max_queries': max(sample['queries']),
+        }
+    total = sum(len(sample['latencies']) for sample in samples.values())
+    return {
+        'endpoints': endpoints,
+        'total': {'requests': total, 'seconds': elapsed, 'throughput_rps': total / elapsed if elapsed else 0},
+    }
+
+
+def regressions(result, baseline, threshold):
+    """List endpoints whose p95 latency or query count regressed past ``threshold``."""
+    problems = []
+    for name, current in result['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if previous is None:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + threshold):
+            problems.append(f"{name}: p95 {previous['p95_ms']:.2f} ms -> {current['p95_ms']:.2f} ms")
+        if current['mean_queries'] > previous['mean_queries'] * (1 + threshold) + 0.5:
+            problems.append(
+                f"{name}: queries {previous['mean_queries']:.1f} -> {current['mean_queries']:.1f}"
+            )
+        if current['errors'] > previous['errors']:
+            problems.append(f"{name}: errors {previous['errors']} -> {current['errors']}")
+    return problems
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+
+from accounts.partitioning import (
+    PARTITIONED_MODELS, add_months, archive_month, drop_month, live_cutoff, month_start,
+)
+
+
+class Command(BaseCommand):
+    help = 'Move months older than PARTITION_LIVE_MONTHS into compressed archive files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be archived.')
+
+    def handle(self, *args, **options):
+        cutoff = live_cutoff()
+        for model in PARTITIONED_MODELS:
+            table = model._meta.db_table
+            oldest = model.objects.filter(timestamp__lt=cutoff).aggregate(oldest=Min('timestamp'))['oldest']
+            if oldest is None:
+                self.stdout.write(f'{table}: nothing older than {cutoff:%Y-%m}.')
+                continue
+            month = month_start(timezone.localtime(oldest))
+            while month < cutoff:
+                if options['dry_run']:
+                    self.stdout.write(f'{table}: would archive {month:%Y-%m}.')
+                else:
+                    # Rows are only dropped once they are safely in the archive.
+                    count = archive_month(model, month)
+                    drop_month(model, month)
+                    if count:
+                        self.stdout.write(f'{table}: archived {count} row(s) from {month:%Y-%m}.')
+                month = add_months(month, 1)
@@ -0,0 +1,147 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import path
+from django.utils import timezone
+
+from accounts import loadtest
+from accounts.changelist import CURSOR_VAR
+from accounts.models import CustomUser, Transaction
+
+admin.autodiscover()
+
+
+class StockTransactionAdmin(admin.ModelAdmin):
+    """The changelist configuration before the large-table changes."""
+    list_display = ('transaction_id', 'sender', 'receiver_name', 'receiver_account_number', 'amount', 'timestamp')
+    search_fields = ('transaction_id', 'sender__email', 'receiver_name', 'receiver_account_number')
+    list_filter = ('timestamp',)
+    ordering = ('-timestamp',)
+
+
+stock_site = admin.AdminSite(name='stock_admin')
+stock_site.register(Transaction, StockTransactionAdmin)
+
+# Served through override_settings(ROOT_URLCONF=...) while benchmarking.
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('stock-admin/', stock_site.urls),
+]
+
+
+def seed(rows, users, months, rng):
+    """Create ``users`` synthetic users and ``rows`` transfers spread over ``months``."""
+    data = loadtest.seed(users=users, transactions=0, sessions=0, rng=rng)
+    now = timezone.now()
+    span = timedelta(days=30 * months).total_seconds()
+    batch = []
+    for _ in range(rows):
+        sender, receiver = rng.sample(data.users, 2)
+        batch.append(Transaction(
+            sender=sender,
+            receiver=receiver,
+            amount=Decimal('10.00'),
+            receiver_name=receiver.full_name,
+            receiver_account_number=data.wallet_numbers[receiver.id],
+            timestamp=now - timedelta(seconds=rng.uniform(0, span)),
+        ))
+        if len(batch) == 10000:
+            Transaction.objects.bulk_create(batch)
+            batch = []
+    Transaction.objects.bulk_create(batch)
+    # Refresh planner statistics so row estimates reflect the new rows.
+    # (MySQL's ANALYZE TABLE would commit the transaction; InnoDB
+    # re-samples on its own.)
+    if connection.vendor in ('sqlite', 'postgresql'):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    return data
+
+
+def scenarios(data, rows):
+    """``(label, stock params, fast params)``; fast params of None reuse the stock ones."""
+    sample = Transaction.objects.order_by('-timestamp', '-pk')[rows // 2]
+    user = random.Random(1).choice(data.users)
+    now = timezone.localtime()
+    return [
+        ('first page', {}, {}),
+        ('deep page', {'p': str(rows // 200)},
+         {CURSOR_VAR: f'{sample.timestamp.isoformat()}|{sample.pk}'}),
+        ('search email', {'q': user.email}, None),
+        ('search account', {'q': data.wallet_numbers[user.id]}, None),
+        ('search name prefix', {'q': 'Bench Trader 12'}, None),
+        ('search transaction id', {'q': str(sample.transaction_id)}, None),
+        ('drill-down year', {'timestamp__year': str(now.year)}, None),
+        ('drill-down month', {'timestamp__year': str(now.year), 'timestamp__month': str(now.month)}, None),
+    ]
+
+
+def create_admin_user():
+    return CustomUser.objects.create_superuser(
+        email=f'bench-admin-{time.time_ns()}@example.com', password=loadtest.BENCH_PASSWORD,
+        full_name='Bench Admin', phone_number='0800000000', country='Nigeria', state_province='Lagos',
+        preferred_language='English', business_type='business', language='English',
+    )
+
+
+def measure(client, url, params, repeat):
+    """Return ``(median ms, queries per request, last status code)``."""
+    timings = []
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    for _ in range(repeat):
+        queries.clear()
+        with connection.execute_wrapper(count):
+            began = time.perf_counter()
+            response = client.get(url, params)
+            timings.append((time.perf_counter() - began) * 1000)
+    return statistics.median(timings), len(queries), response.status_code
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the Transaction admin changelist (first and deep pages, searches, date drill-down) '
+        'against the stock ModelAdmin configuration. Synthetic rows are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000000, help='Synthetic transactions.')
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--months', type=int, default=24, help='Months of history to spread rows over.')
+        parser.add_argument('--repeat', type=int, default=3, help='Requests per scenario; the median is reported.')
+
+    def handle(self, *args, **options):
+        with override_settings(ROOT_URLCONF=__name__), transaction.atomic():
+            self.stdout.write(f"Seeding {options['rows']} transactions for {options['users']} users...")
+            data = seed(options['rows'], options['users'], options['months'], random.Random(0))
+            client = Client()
+            client.force_login(create_admin_user())
+
+            self.stdout.write(f"{'scenario':<24}{'stock ms':>10}{'queries':>9}{'fast ms':>10}{'queries':>9}")
+            for label, stock_params, fast_params in scenarios(data, options['rows']):
+                stock = self._time(client, '/stock-admin/accounts/transaction/', stock_params, options['repeat'])
+                fast = self._time(
+                    client, '/admin/accounts/transaction/',
+                    stock_params if fast_params is None else fast_params, options['repeat'],
+                )
+                self.stdout.write(
+                    f"{label:<24}{stock[0]:>10.1f}{stock[1]:>9}{fast[0]:>10.1f}{fast[1]:>9}"
+                )
+            transaction.set_rollback(True)
+
+    def _time(self, client, url, params, repeat):
+        elapsed, queries, status = measure(client, url, params, repeat)
+        if status != 200:
+            self.stderr.write(f'{url} {params}: HTTP {status}')
+        return elapsed, queries
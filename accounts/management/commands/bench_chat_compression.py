@@ -0,0 +1,70 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts import compression, prompts
+from accounts.views import ChatBotView
+
+PHRASES = [
+    "To export {product} from {origin} to {destination}, you will need a Certificate of Origin.",
+    "Go to the {origin} Trade Portal and click on 'Trade Procedures', then select 'Export'.",
+    "Apply for a Phytosanitary Certificate from the national plant protection office.",
+    "Under AfCFTA, goods that meet the rules of origin may qualify for reduced tariffs.",
+    "Customs clearance at the border usually takes between two and five working days.",
+    "Keep copies of your commercial invoice, packing list and bill of lading.",
+    "Fees vary, so confirm the current amount with the agency before you pay.",
+    "A common mistake is to ship before the permit is approved, so wait for confirmation.",
+]
+PRODUCTS = ['dried hibiscus', 'cashew nuts', 'shea butter', 'cocoa beans', 'textiles', 'sesame seeds']
+BENCH_DICTIONARY_ID = 0xFFFF
+
+COUNTRIES = ['Nigeria', 'Ghana', 'Kenya', 'Tanzania', 'Senegal', 'Rwanda', "Cote d'Ivoire", 'Egypt']
+
+
+def synthetic_reply(rng):
+    lines = []
+    for step in range(rng.randint(4, 14)):
+        phrase = rng.choice(PHRASES).format(
+            product=rng.choice(PRODUCTS), origin=rng.choice(COUNTRIES), destination=rng.choice(COUNTRIES)
+        )
+        lines.append(f"{step + 1}. {phrase}\n")
+    return ''.join(lines)
+
+
+class Command(BaseCommand):
+    help = 'Report storage savings and compress/decompress cost on a synthetic chat corpus (no database writes).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=100000, help='Corpus size (e.g. 1000000).')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        corpus = [synthetic_reply(rng) for _ in range(options['messages'])]
+        raw_size = sum(len(message.encode('utf-8')) for message in corpus)
+        self.stdout.write(f"Corpus: {len(corpus)} messages, {raw_size / 1e6:.1f} MB raw")
+
+        codec = compression.codec_name()
+        dictionary = compression.train_dictionary(corpus[:5000], codec, 64 * 1024)
+        # Register the dictionary in-process only so nothing is written to the database.
+        compression._dictionaries[BENCH_DICTIONARY_ID] = dictionary
+        for label, dict_id in (('no dictionary', 0), ('trained dictionary', BENCH_DICTIONARY_ID)):
+            started = time.perf_counter()
+            stored = [compression.compress(message, codec=codec, dict_id=dict_id) for message in corpus]
+            write_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            for value in stored:
+                compression.decompress(value)
+            read_seconds = time.perf_counter() - started
+            stored_size = sum(len(value) for value in stored)
+            self.stdout.write(
+                f"{codec} {label:>18}: {stored_size / 1e6:.1f} MB ({stored_size / raw_size:.1%} of raw), "
+                f"write {write_seconds * 1e6 / len(corpus):.1f} us/msg, read {read_seconds * 1e6 / len(corpus):.1f} us/msg"
+            )
+
+        prompt_bytes = len(prompts.load(ChatBotView.prompt_name).encode('utf-8'))
+        self.stdout.write(
+            f"System prompt: {prompt_bytes} bytes, stored once per version as a PromptTemplate "
+            f"that sessions reference by id."
+        )
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request connection overhead with and without persistent connections.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Number of simulated requests.')
+        parser.add_argument('--database', default='default', help='Database alias to benchmark.')
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        count = options['requests']
+
+        reconnect = self._run(alias, count, persistent=False)
+        persistent = self._run(alias, count, persistent=True)
+
+        self.stdout.write(f"Database alias: {alias} ({connections[alias].vendor})")
+        self.stdout.write(f"Reconnect per request:  {reconnect * 1000 / count:.3f} ms/request")
+        self.stdout.write(f"Persistent connection:  {persistent * 1000 / count:.3f} ms/request")
+        if persistent:
+            self.stdout.write(self.style.SUCCESS(f"Speed-up: {reconnect / persistent:.1f}x"))
+
+    def _run(self, alias, count, persistent):
+        connection = connections[alias]
+        connection.close()
+        start = time.perf_counter()
+        for _ in range(count):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            if not persistent:
+                # What CONN_MAX_AGE=0 does at the end of every request.
+                connection.close()
+        elapsed = time.perf_counter() - start
+        connection.close()
+        return elapsed
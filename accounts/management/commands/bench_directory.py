@@ -0,0 +1,66 @@
+import random
+import statistics
+import time
+from contextlib import ExitStack
+
+from django.core.cache import cache, caches
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from accounts import directory, loadtest
+from accounts.models import Wallet
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare recipient verification through the wallet directory cache with the '
+        'previous two-query lookup. Seeded wallets are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wallets', type=int, default=50000, help='Wallets to seed (e.g. 1000000).')
+        parser.add_argument('--lookups', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        with transaction.atomic():
+            data = loadtest.seed(users=options['wallets'], transactions=0, sessions=0, rng=rng)
+            numbers = list(data.wallet_numbers.values())
+            sample = [rng.choice(numbers) for _ in range(options['lookups'])]
+            cache.delete_many([directory._key(number) for number in set(sample)])
+
+            def two_queries(number):
+                return Wallet.objects.get(wallet_number=number).user.full_name
+
+            for label, verify in (
+                ('two queries (before)', two_queries),
+                ('directory, cold', directory.lookup),
+                ('directory, warm', directory.lookup),
+            ):
+                timings, queries = self._measure(verify, sample)
+                timings.sort()
+                self.stdout.write(
+                    f"{label:<22} p50 {statistics.median(timings) * 1000:.3f} ms, "
+                    f"p99 {timings[int(len(timings) * 0.99) - 1] * 1000:.3f} ms, "
+                    f"{queries / len(sample):.2f} queries/verify"
+                )
+            self.stdout.write(f"Cache backend: {caches['default'].__class__.__name__}")
+            transaction.set_rollback(True)
+
+    def _measure(self, verify, sample):
+        timings = []
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count))
+            for number in sample:
+                started = time.perf_counter()
+                verify(number)
+                timings.append(time.perf_counter() - started)
+        return timings, queries
@@ -0,0 +1,96 @@
+import json
+import random
+from unittest import mock
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.throttling import ScopedRateThrottle
+
+from accounts import loadtest
+from accounts.views import ChatBotView
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed synthetic data, drive every accounts endpoint with a weighted traffic mix and '
+        'report throughput, latency percentiles and query counts. All writes are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--transactions', type=int, default=5000)
+        parser.add_argument('--sessions', type=int, default=200)
+        parser.add_argument('--iterations', type=int, default=500, help='Number of scenarios to run.')
+        parser.add_argument(
+            '--mix', default=','.join(f'{name}={weight}' for name, weight in loadtest.DEFAULT_MIX.items()),
+            help='Scenario weights, e.g. browse=60,transfer=25,chat=10,auth=5.',
+        )
+        parser.add_argument('--llm-delay', type=float, default=0.0, help='Seconds the stub LLM waits per reply.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the JSON results to this file.')
+        parser.add_argument('--baseline', help='Compare against a previous JSON result.')
+        parser.add_argument('--threshold', type=float, default=0.25, help='Allowed regression, as a fraction.')
+
+    def handle(self, *args, **options):
+        mix = {}
+        for item in options['mix'].split(','):
+            name, _, weight = item.partition('=')
+            if name not in loadtest.DEFAULT_MIX or not weight.isdigit():
+                raise CommandError(f'Invalid mix entry {item!r}.')
+            mix[name] = int(weight)
+
+        rng = random.Random(options['seed'])
+        # The velocity rules and the verify throttle would reject some of the
+        # synthetic traffic, and errors count as regressions; lift them so
+        # the run measures the endpoints rather than the limits.
+        unlimited = {rule: float('inf') for rule in settings.VELOCITY_RULES}
+        # Seeded rows are never committed, so a replica could not see them;
+        # every read is kept on the primary for the duration of the run.
+        with loadtest.StubLLMServer(delay=options['llm_delay']) as llm, \
+                mock.patch.object(ChatBotView, 'OPENROUTER_URL', llm.url), \
+                mock.patch('backend.db_router.replica_enabled', return_value=False), \
+                mock.patch.dict(ScopedRateThrottle.THROTTLE_RATES, {'wallet_verify': None}), \
+                override_settings(VELOCITY_RULES=unlimited), \
+                transaction.atomic():
+            data = loadtest.seed(
+                users=options['users'], transactions=options['transactions'],
+                sessions=options['sessions'], rng=rng,
+            )
+            runner = loadtest.LoadRunner(data, rng=rng)
+            elapsed = runner.run(options['iterations'], mix)
+            transaction.set_rollback(True)
+
+        result = loadtest.summarize(runner.samples, elapsed)
+        result['meta'] = {
+            'created_at': timezone.now().isoformat(),
+            'database': settings.DATABASES['default']['ENGINE'],
+            'users': options['users'],
+            'transactions': options['transactions'],
+            'sessions': options['sessions'],
+            'iterations': options['iterations'],
+            'mix': mix,
+        }
+
+        self.stdout.write(f"{'endpoint':<28}{'reqs':>6}{'err':>5}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}")
+        for name, stats in result['endpoints'].items():
+            self.stdout.write(
+                f"{name:<28}{stats['requests']:>6}{stats['errors']:>5}{stats['throughput_rps']:>9.1f}"
+                f"{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}{stats['mean_queries']:>9.1f}"
+            )
+        total = result['total']
+        self.stdout.write(f"Total: {total['requests']} requests in {total['seconds']:.2f}s ({total['throughput_rps']:.1f} rps)")
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(result, output, indent=2)
+
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+            problems = loadtest.regressions(result, baseline, options['threshold'])
+            if problems:
+                raise CommandError('Performance regressions:\n  ' + '\n  '.join(problems))
+            self.stdout.write(self.style.SUCCESS('No regressions against baseline.'))
@@ -0,0 +1,52 @@
+import random
+import statistics
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from django.urls import reverse
+
+from accounts import loadtest
+from accounts.models import Wallet
+
+
+class Command(BaseCommand):
+    help = 'Compare same-currency and FX-converting transfer throughput. All writes are rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--transfers', type=int, default=500, help='Transfers per kind.')
+        parser.add_argument('--foreign-currency', default='GHS')
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        unlimited = {rule: float('inf') for rule in settings.VELOCITY_RULES}
+        with override_settings(VELOCITY_RULES=unlimited), transaction.atomic():
+            data = loadtest.seed(users=options['users'], transactions=0, sessions=0, rng=rng)
+            half = len(data.users) // 2
+            local, foreign = data.users[:half], data.users[half:]
+            Wallet.objects.filter(user__in=foreign).update(currency=options['foreign_currency'])
+
+            runner = loadtest.LoadRunner(data, rng=rng)
+            for name, recipients in (('plain', local), ('converting', foreign)):
+                for _ in range(options['transfers']):
+                    sender = rng.choice(local)
+                    recipient = rng.choice(recipients)
+                    while recipient.id == sender.id:
+                        recipient = rng.choice(recipients)
+                    runner.call(name, 'post', reverse('wallet-transfer'), sender, {
+                        'recipient_wallet_number': data.wallet_numbers[recipient.id],
+                        'amount': '100.00',
+                        'step': 'transfer',
+                        'pin': loadtest.BENCH_PIN,
+                    })
+            transaction.set_rollback(True)
+
+        for name, sample in runner.samples.items():
+            latencies = sorted(sample['latencies'])
+            self.stdout.write(
+                f"{name:>10}: {len(latencies) / sum(latencies):.1f} transfers/s, "
+                f"p50 {statistics.median(latencies) * 1000:.2f} ms, "
+                f"{statistics.mean(sample['queries']):.1f} queries, {sample['errors']} errors"
+            )
@@ -0,0 +1,141 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.models import CustomUser, Transaction
+from accounts.partitioning import existing_partitions, month_range, native_partitioning_available
+
+
+# Unpartitioned copy of the transaction table, compared against the live one.
+COPY_TABLE = 'bench_transaction_unpartitioned'
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark recent-history query latency with and without month bounds and, on MySQL, on the '
+        'partitioned table against an unpartitioned copy with the same indexes. '
+        'Synthetic rows are inserted inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Synthetic transactions (e.g. 10000000).')
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--months', type=int, default=24, help='Months of history to spread rows over.')
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            users = self._seed(options, rng)
+            now = timezone.localtime()
+            start, end = month_range(now)
+
+            def full_history(user):
+                return Transaction.objects.filter(Q(sender=user) | Q(receiver=user)).order_by('-timestamp')[:50]
+
+            def recent_month(user):
+                return (
+                    Transaction.objects.filter(Q(sender=user) | Q(receiver=user))
+                    .filter(timestamp__gte=start, timestamp__lt=end)
+                    .order_by('-timestamp')[:50]
+                )
+
+            tables = [('live', list)]
+            if native_partitioning_available() and existing_partitions(Transaction):
+                self._copy_unpartitioned()
+                tables = [('partitioned', list), ('unpartitioned', self._on_copy)]
+            else:
+                self.stdout.write(
+                    f'The transaction table is not natively partitioned on {connection.vendor}; '
+                    'timing the live table only.'
+                )
+
+            for label, query in (('unbounded', full_history), ('month-bounded', recent_month)):
+                for table, run in tables:
+                    timings = []
+                    for _ in range(options['queries']):
+                        user = rng.choice(users)
+                        began = time.perf_counter()
+                        run(query(user))
+                        timings.append((time.perf_counter() - began) * 1000)
+                    timings.sort()
+                    self.stdout.write(
+                        f"{label:>14} {table:>13}: p50 {statistics.median(timings):.2f} ms, "
+                        f"p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms"
+                    )
+            if len(tables) > 1:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DROP TEMPORARY TABLE {connection.ops.quote_name(COPY_TABLE)}')
+            transaction.set_rollback(True)
+
+    def _copy_unpartitioned(self):
+        """
+        Copy the seeded table into an unpartitioned temporary table with the
+        same indexes. Unlike CREATE TABLE or ALTER TABLE, CREATE TEMPORARY
+        TABLE doesn't commit, so the rows are still rolled back.
+        """
+        quote = connection.ops.quote_name
+        table = quote(Transaction._meta.db_table)
+        indexes = {}
+        with connection.cursor() as cursor:
+            cursor.execute(f'SHOW INDEX FROM {table}')
+            columns = [column[0] for column in cursor.description]
+            for row in cursor.fetchall():
+                index = dict(zip(columns, row))
+                order = ' DESC' if index['Collation'] == 'D' else ''
+                indexes.setdefault((index['Key_name'], index['Non_unique']), []).append(
+                    (index['Seq_in_index'], f"{quote(index['Column_name'])}{order}")
+                )
+            keys = []
+            for (name, non_unique), parts in indexes.items():
+                parts = ', '.join(part for _, part in sorted(parts))
+                if name == 'PRIMARY':
+                    keys.append(f'PRIMARY KEY ({parts})')
+                else:
+                    keys.append(f"{'KEY' if non_unique else 'UNIQUE KEY'} {quote(name)} ({parts})")
+            self.stdout.write('Copying rows to an unpartitioned table...')
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {quote(COPY_TABLE)} ({', '.join(keys)}) SELECT * FROM {table}"
+            )
+
+    def _on_copy(self, queryset):
+        """Run ``queryset`` against the unpartitioned copy instead of the live table."""
+        sql, params = queryset.query.sql_with_params()
+        quote = connection.ops.quote_name
+        sql = sql.replace(quote(Transaction._meta.db_table), quote(COPY_TABLE))
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _seed(self, options, rng):
+        self.stdout.write(f"Seeding {options['rows']} transactions for {options['users']} users...")
+        users = [
+            CustomUser.objects.create(email=f'bench-partition-{i}@example.com', full_name=f'Bench User {i}')
+            for i in range(options['users'])
+        ]
+        now = timezone.now()
+        span = timedelta(days=30 * options['months']).total_seconds()
+        batch = []
+        for _ in range(options['rows']):
+            sender, receiver = rng.sample(users, 2)
+            batch.append(Transaction(
+                sender=sender,
+                receiver=receiver,
+                amount=Decimal('10.00'),
+                receiver_name=receiver.full_name,
+                receiver_account_number='000000',
+                timestamp=now - timedelta(seconds=rng.uniform(0, span)),
+            ))
+            if len(batch) == 5000:
+                Transaction.objects.bulk_create(batch)
+                batch = []
+        Transaction.objects.bulk_create(batch)
+        return users
@@ -0,0 +1,135 @@
+import itertools
+import random
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts import loadtest, search
+from accounts.models import SearchDocument
+
+TRADE_WORDS = (
+    'export import shipment customs duty tariff invoice payment container freight port clearance '
+    'certificate origin license permit cocoa shea butter cashew sesame ginger hibiscus coffee tea '
+    'ghana nigeria kenya senegal togo benin lagos accra nairobi mombasa tema apapa buyer supplier '
+    'contract price quote sample warehouse insurance bank letter credit transfer deposit wallet'
+).split()
+FILLER_WORDS = 20000
+# One message in this many mentions the rare phrase.
+RARE_EVERY = 5000
+RARE_PHRASE = 'You will need a phytosanitary certificate for Kenya.'
+
+QUERIES = [
+    ('rare phrase', 'phytosanitary certificate Kenya'),
+    ('common word', 'export'),
+    ('two common words', 'cocoa ghana'),
+    ('no match', 'tungsten kazakhstan'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Time full-text search against the icontains scan it replaces, over synthetic chat messages. '
+        'One user owns --heavy-share of all messages. Synthetic rows are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=10000000)
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--heavy-share', type=float, default=0.05, help='Share of messages owned by one user.')
+        parser.add_argument('--queries', type=int, default=20, help='Repetitions per scenario.')
+        parser.add_argument('--backend', choices=['fts5', 'mysql', 'python'], help='Defaults to SEARCH_BACKEND.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        search._backend = options['backend']
+        self.stdout.write(f'Search backend: {search.backend()}')
+        rng = random.Random(0)
+        with transaction.atomic():
+            users = loadtest.seed(users=options['users'], transactions=0, sessions=0, rng=rng).users
+            heavy = users[0]
+            self._seed(users, heavy, rng, options)
+
+            typical = itertools.cycle(rng.sample(users[1:], min(len(users) - 1, options['queries'])))
+            page_size = settings.SEARCH_PAGE_SIZE
+            self.stdout.write(
+                f"{'scenario':<20}{'user':<9}{'index p50':>10}{'p95':>9}{'icontains p50':>15}{'p95':>9}{'hits':>6}"
+            )
+            for label, query in QUERIES:
+                for owner in ('typical', 'heavy'):
+                    index_timings, scan_timings = [], []
+                    for _ in range(options['queries']):
+                        user = heavy if owner == 'heavy' else next(typical)
+                        started = time.perf_counter()
+                        results, _ = search.search(user, query)
+                        index_timings.append(time.perf_counter() - started)
+                        started = time.perf_counter()
+                        self._icontains(user, query, page_size)
+                        scan_timings.append(time.perf_counter() - started)
+                    self.stdout.write(
+                        f"{label:<20}{owner:<9}{self._ms(index_timings)}{self._ms(scan_timings, 15)}"
+                        f"{len(results):>6}"
+                    )
+
+            timings = []
+            for user in itertools.islice(itertools.cycle(users), 500):
+                document = self._document(user, rng, timezone.now())
+                started = time.perf_counter()
+                search.add_documents([document])
+                timings.append(time.perf_counter() - started)
+            self.stdout.write(f"Indexing one new message: p50 {statistics.median(timings) * 1000:.3f} ms")
+            transaction.set_rollback(True)
+        search._backend = None
+
+    def _ms(self, timings, width=10):
+        timings = sorted(timings)
+        p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+        return f'{statistics.median(timings) * 1000:>{width}.2f}{p95 * 1000:>9.2f}'
+
+    def _icontains(self, user, query, page_size):
+        """The search this replaces: substring scans over the user's text, newest first."""
+        documents = SearchDocument.objects.filter(user=user)
+        for word in query.split():
+            documents = documents.filter(body__icontains=word)
+        return list(documents.order_by('-timestamp')[:page_size])
+
+    def _seed(self, users, heavy, rng, options):
+        self.stdout.write(f"Seeding {options['messages']} messages for {len(users)} users...")
+        # Object ids well above any real row, so the unique constraint holds.
+        self._ids = itertools.count(10 ** 15)
+        self._vocabulary = TRADE_WORDS + [f'w{n}' for n in range(FILLER_WORDS)]
+        # Zipf-like: trade words are the most frequent, filler words trail off.
+        self._weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(self._vocabulary))))
+        now = timezone.now()
+        batch = []
+        for index in range(options['messages']):
+            user = heavy if rng.random() < options['heavy_share'] else rng.choice(users)
+            batch.append(self._document(user, rng, now - timedelta(seconds=index), rare=index % RARE_EVERY == 0))
+            if len(batch) == options['batch_size']:
+                search.add_documents(batch, options['batch_size'])
+                batch = []
+        search.add_documents(batch, options['batch_size'])
+        if connection.vendor in ('sqlite', 'postgresql'):
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def _document(self, user, rng, timestamp, rare=False):
+        words = rng.choices(self._vocabulary, cum_weights=self._weights, k=rng.randint(15, 60))
+        body = ' '.join(words).capitalize() + '.'
+        if rare:
+            body += ' ' + RARE_PHRASE
+        return SearchDocument(
+            user=user,
+            kind='message',
+            object_id=next(self._ids),
+            reference=uuid.uuid4(),
+            label='assistant',
+            body=body,
+            length=len(search.tokenize(body)),
+            timestamp=timestamp,
+        )
@@ -0,0 +1,46 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.velocity import VelocityEngine
+
+
+class Command(BaseCommand):
+    help = 'Measure in-memory velocity rule checks per second (no database access).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--events', type=int, default=500000, help='Transfers preloaded into the window.')
+        parser.add_argument('--checks', type=int, default=200000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        engine = VelocityEngine()
+        now = time.time()
+        wallets = [f'{n:06d}' for n in range(options['users'])]
+        window = engine.window
+
+        started = time.perf_counter()
+        for _ in range(options['events']):
+            engine.record(rng.randrange(options['users']), rng.choice(wallets), rng.uniform(1, 5000),
+                          now=now - rng.uniform(0, window))
+        load_seconds = time.perf_counter() - started
+
+        checks = [
+            (rng.randrange(options['users']), rng.choice(wallets), rng.uniform(1, 5000))
+            for _ in range(options['checks'])
+        ]
+        started = time.perf_counter()
+        blocked = 0
+        for sender_id, wallet_number, amount in checks:
+            if engine.check(sender_id, wallet_number, amount, now=now):
+                blocked += 1
+        check_seconds = time.perf_counter() - started
+
+        self.stdout.write(f"Loaded {options['events']} events in {load_seconds:.2f}s")
+        self.stdout.write(
+            f"{options['checks']} checks in {check_seconds:.2f}s: "
+            f"{options['checks'] / check_seconds:,.0f} checks/s, "
+            f"{check_seconds * 1e6 / options['checks']:.1f} us/check, {blocked} blocked"
+        )
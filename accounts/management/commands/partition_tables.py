@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.partitioning import (
+    PARTITIONED_MODELS, add_future_partitions, add_months, existing_partitions, live_cutoff,
+    native_partitioning_available, partition_table,
+)
+
+
+class Command(BaseCommand):
+    help = 'Create or roll forward monthly MySQL partitions for Transaction and ChatMessage.'
+
+    def handle(self, *args, **options):
+        if not native_partitioning_available():
+            self.stdout.write(
+                'Native partitioning needs MySQL; on this database months are kept apart by the '
+                'timestamp indexes and archive_partitions.'
+            )
+            return
+
+        months_ahead = settings.PARTITION_MONTHS_AHEAD
+        for model in PARTITIONED_MODELS:
+            table = model._meta.db_table
+            if existing_partitions(model):
+                added = add_future_partitions(model, months_ahead)
+                self.stdout.write(f'{table}: added {added} partition(s).')
+                continue
+            oldest = model.objects.order_by('timestamp').values_list('timestamp', flat=True).first()
+            first_month = timezone.localtime(oldest) if oldest else live_cutoff()
+            partition_table(model, first_month, months_ahead)
+            self.stdout.write(self.style.SUCCESS(
+                f'{table}: partitioned from {first_month:%Y-%m} to '
+                f'{add_months(timezone.localtime(), months_ahead):%Y-%m}.'
+            ))
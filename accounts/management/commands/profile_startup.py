@@ -0,0 +1,124 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _parse_importtime(stderr):
+    """``{module: (self_us, cumulative_us)}`` from ``python -X importtime`` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        'Boot the app in fresh interpreters and report cold-start cost: time per phase, per installed app '
+        'and per imported module, first-request latency and memory. With --workers, simulate a prefork '
+        'server and report per-worker memory.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/auth/user-info/', help='URL for the first request.')
+        parser.add_argument('--runs', type=int, default=3, help='Cold starts to take the median of.')
+        parser.add_argument('--top', type=int, default=15, help='Number of modules to list.')
+        parser.add_argument('--warm', action='store_true', help='Run the warm-up hook before the first request.')
+        parser.add_argument('--workers', type=int, default=0, help='Fork this many workers after boot.')
+        parser.add_argument('--output', help='Write the JSON results to this file.')
+
+    def probe(self, options, importtime):
+        code = (
+            'from accounts.startup import profile_process; '
+            f"profile_process({options['path']!r}, warm={options['warm']!r}, workers={options['workers']!r})"
+        )
+        command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'backend.settings')}
+        started = time.perf_counter()
+        result = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        elapsed = time.perf_counter() - started
+        if result.returncode != 0:
+            raise CommandError(f'Startup probe failed:\n{result.stderr[-2000:]}')
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        report['process'] = elapsed
+        report['modules'] = _parse_importtime(result.stderr) if importtime else {}
+        return report
+
+    def handle(self, *args, **options):
+        if options['workers']:
+            return self.handle_workers(options)
+
+        reports = [self.probe(options, importtime=True) for _ in range(options['runs'])]
+        median = statistics.median
+
+        self.stdout.write(f"Cold start, median of {len(reports)} run(s):")
+        for phase in reports[0]['phases']:
+            self.stdout.write(f"  {phase:<18}{median(r['phases'][phase] for r in reports) * 1000:>9.1f} ms")
+        first_request = median(r['first_request'] for r in reports)
+        self.stdout.write(f"  {'first request':<18}{first_request * 1000:>9.1f} ms  ({reports[0]['status']})")
+        self.stdout.write(f"  {'process total':<18}{median(r['process'] for r in reports) * 1000:>9.1f} ms")
+        memory = reports[0]['master_memory']
+        self.stdout.write(f"  memory before first request: {memory.get('rss', 0) / 1024:.1f} MiB RSS")
+
+        self.stdout.write('\nApp registry (import / models / ready):')
+        for label in reports[0]['apps']:
+            steps = [median(r['apps'][label].get(step, 0) for r in reports) * 1000
+                     for step in ('import', 'models', 'ready')]
+            self.stdout.write(f"  {label:<16}" + ''.join(f'{value:>9.1f}' for value in steps) + ' ms')
+
+        modules = defaultdict(list)
+        for report in reports:
+            for name, timing in report['modules'].items():
+                modules[name].append(timing)
+        packages = defaultdict(float)
+        for name, timings in modules.items():
+            packages[name.split('.')[0]] += median(self_us for self_us, _ in timings)
+        self.stdout.write(f'\nImport time by top-level package (self time, top {options["top"]}):')
+        for name, self_us in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'  {name:<32}{self_us / 1000:>9.1f} ms')
+        self.stdout.write(f'\nSlowest modules (cumulative, top {options["top"]}):')
+        cumulative = {name: median(total for _, total in timings) for name, timings in modules.items()}
+        for name, total_us in sorted(cumulative.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'  {name:<48}{total_us / 1000:>9.1f} ms')
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump({
+                    'phases': {phase: median(r['phases'][phase] for r in reports) for phase in reports[0]['phases']},
+                    'first_request': first_request,
+                    'process': median(r['process'] for r in reports),
+                    'master_memory': memory,
+                    'packages_ms': {name: self_us / 1000 for name, self_us in packages.items()},
+                }, output, indent=2)
+
+    def handle_workers(self, options):
+        report = self.probe(options, importtime=False)
+        mode = 'preloaded and warmed in the master' if options['warm'] else 'booted separately in each worker'
+        self.stdout.write(f"{options['workers']} worker(s), app {mode}:")
+        if 'master_memory' in report:
+            memory = report['master_memory']
+            self.stdout.write(f"  master: {memory.get('rss', 0) / 1024:.1f} MiB RSS")
+        for index, worker in enumerate(report['workers']):
+            if 'error' in worker:
+                self.stdout.write(self.style.ERROR(f"  worker {index}: {worker['error']}"))
+                continue
+            memory = worker['memory']
+            boot = f", boot {worker['boot'] * 1000:.1f} ms" if 'boot' in worker else ''
+            self.stdout.write(
+                f"  worker {index}: first request {worker['first_request'] * 1000:.1f} ms{boot}, "
+                f"{memory.get('rss', 0) / 1024:.1f} MiB RSS, {memory.get('pss', 0) / 1024:.1f} MiB PSS, "
+                f"{memory.get('private', 0) / 1024:.1f} MiB private"
+            )
+        self.stdout.write(f"  total wall time: {report['process'] * 1000:.1f} ms")
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from accounts import search
+from accounts.models import ChatMessage, Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the search documents from the live chat messages and transactions. New rows are indexed '
+        'as they are created; run this once after upgrading, after bulk loads, or after changing SEARCH_BACKEND.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.ARCHIVE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        with transaction.atomic():
+            search.clear(batch_size)
+
+            messages = ChatMessage.objects.select_related('chat_session').order_by('id')
+            count = self.index(
+                messages, batch_size,
+                lambda message: search.message_documents(message, message.chat_session.user_id),
+            )
+            self.stdout.write(f'Indexed {count} chat message document(s).')
+
+            transactions = Transaction.objects.order_by('id')
+            count = self.index(transactions, batch_size, search.transaction_documents)
+            self.stdout.write(f'Indexed {count} transaction document(s).')
+
+            if search.backend() == 'fts5':
+                # Merge the index segments written batch by batch.
+                with connection.cursor() as cursor:
+                    cursor.execute(f"INSERT INTO {search.FTS_TABLE}({search.FTS_TABLE}) VALUES ('optimize')")
+        self.stdout.write(f'Search backend: {search.backend()}')
+
+    def index(self, queryset, batch_size, to_documents):
+        count = 0
+        documents = []
+        for row in queryset.iterator(chunk_size=batch_size):
+            documents.extend(to_documents(row))
+            if len(documents) >= batch_size:
+                search.add_documents(documents, batch_size)
+                count += len(documents)
+                documents = []
+        search.add_documents(documents, batch_size)
+        return count + len(documents)
@@ -0,0 +1,135 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from accounts import reconciliation
+from accounts.models import CustomUser, ReconciliationRun, Transaction
+
+
+def _init_worker():
+    # Spawned (not forked) workers start without Django configured.
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = (
+        'Check wallet balances against the transaction ledger. Full runs replay every transaction and '
+        'assume every balance change has one; for balances that predate the ledger use --adopt-current '
+        'once and --incremental afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        mode = parser.add_mutually_exclusive_group()
+        mode.add_argument('--incremental', action='store_true',
+                          help='Only process transactions after the last checkpoint.')
+        mode.add_argument('--adopt-current', action='store_true',
+                          help='Take the current balances as the ledger and checkpoint at the latest transaction. '
+                               'Run once, while transfers are quiet, on data that predates the ledger.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--shards', type=int, default=None, help='Defaults to four per worker.')
+        parser.add_argument('--chunk-size', type=int, default=20000)
+        parser.add_argument('--no-save', action='store_true', help='Report only; keep the ledger and checkpoint.')
+
+    def handle(self, *args, **options):
+        if options['adopt_current']:
+            return self.adopt()
+
+        started_at = timezone.now()
+        after_id = 0
+        opening = {}
+        mode = 'full'
+        if options['incremental']:
+            checkpoint = ReconciliationRun.objects.filter(finished_at__isnull=False).order_by('-id').first()
+            if checkpoint is None:
+                raise CommandError('No checkpoint yet. Run a full reconciliation or --adopt-current first.')
+            after_id = checkpoint.last_transaction_id
+            opening = reconciliation.ledger_balances()
+            mode = 'incremental'
+
+        upto_id = max(reconciliation.settled_transaction_id(started_at), after_id)
+        bounds = CustomUser.objects.aggregate(low=Min('id'), high=Max('id'))
+        expected = defaultdict(int, opening)
+        processed = 0
+        if bounds['low'] is not None and upto_id > after_id:
+            shards = reconciliation.user_shards(
+                bounds['low'], bounds['high'], options['shards'] or options['workers'] * 4,
+            )
+            for count, deltas in self.run_shards(shards, after_id, upto_id, options):
+                processed += count
+                for key, cents in deltas.items():
+                    expected[key] += cents
+        if mode == 'full':
+            for key, cents in reconciliation.archived_deltas().items():
+                expected[key] += cents
+
+        actual = reconciliation.current_balances()
+        suspected = reconciliation.compare(expected, actual)
+        mismatches = reconciliation.recheck(suspected, expected, upto_id) if suspected else []
+
+        self.stdout.write(
+            f'Read {processed} transaction row(s) up to id {upto_id}; '
+            f'checked {len(actual)} balance(s), {len(suspected)} suspected, {len(mismatches)} mismatched.'
+        )
+        for user_id, currency, expected_cents, actual_cents in mismatches:
+            self.stdout.write(self.style.ERROR(
+                f'user {user_id} {currency}: expected {reconciliation.from_cents(expected_cents)}, '
+                f'balance {reconciliation.from_cents(actual_cents)}'
+            ))
+        if options['no_save']:
+            return
+
+        reconciliation.save_ledger(
+            {key: cents for key, cents in expected.items() if cents or key in opening},
+            replace=mode == 'full',
+        )
+        ReconciliationRun.objects.create(
+            mode=mode,
+            started_at=started_at,
+            finished_at=timezone.now(),
+            last_transaction_id=upto_id,
+            transactions_processed=processed,
+            balances_checked=len(actual),
+            mismatches=[
+                {'user_id': user_id, 'currency': currency,
+                 'expected': str(reconciliation.from_cents(expected_cents)),
+                 'actual': str(reconciliation.from_cents(actual_cents))}
+                for user_id, currency, expected_cents, actual_cents in mismatches
+            ],
+        )
+
+    def run_shards(self, shards, after_id, upto_id, options):
+        chunk_size = options['chunk_size']
+        if options['workers'] <= 1:
+            for lo, hi in shards:
+                yield reconciliation.reconcile_shard(lo, hi, after_id, upto_id, chunk_size)
+            return
+        # Forked workers must not share the parent's database sockets.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+            futures = [
+                pool.submit(reconciliation.reconcile_shard, lo, hi, after_id, upto_id, chunk_size)
+                for lo, hi in shards
+            ]
+            for future in futures:
+                yield future.result()
+
+    def adopt(self):
+        started_at = timezone.now()
+        with transaction.atomic():
+            upto_id = Transaction.objects.aggregate(last=Max('id'))['last'] or 0
+            balances = reconciliation.current_balances()
+            reconciliation.save_ledger(balances, replace=True)
+            ReconciliationRun.objects.create(
+                mode='adopt',
+                started_at=started_at,
+                finished_at=timezone.now(),
+                last_transaction_id=upto_id,
+                balances_checked=len(balances),
+            )
+        self.stdout.write(f'Adopted {len(balances)} balance(s) as the ledger, checkpoint at transaction {upto_id}.')
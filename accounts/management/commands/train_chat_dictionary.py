@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from accounts.compression import codec_name, train_dictionary
+from accounts.models import ChatMessage, CompressionDictionary
+
+
+class Command(BaseCommand):
+    help = 'Train a compression dictionary from recent chat messages; new messages use it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=5000, help='Number of recent messages to sample.')
+        parser.add_argument('--size', type=int, default=64 * 1024, help='Maximum dictionary size in bytes.')
+
+    def handle(self, *args, **options):
+        codec = codec_name()
+        messages = ChatMessage.objects.filter(role='assistant').order_by('-id')[:options['samples']]
+        samples = [message.content for message in messages.iterator()]
+        if not samples:
+            self.stdout.write('No assistant messages to train on yet.')
+            return
+        data = train_dictionary(samples, codec, options['size'])
+        if not data:
+            self.stdout.write('Not enough repeated content to build a dictionary yet.')
+            return
+        dictionary = CompressionDictionary.objects.create(codec=codec, data=data, sample_count=len(samples))
+        self.stdout.write(self.style.SUCCESS(
+            f'Trained {codec} dictionary {dictionary.pk} ({len(data)} bytes) from {len(samples)} messages.'
+        ))
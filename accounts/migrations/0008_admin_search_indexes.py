@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_reconciliation_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['receiver_account_number', '-timestamp'], name='txn_receiver_acct_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['receiver_name'], name='txn_receiver_name_idx'),
+        ),
+    ]
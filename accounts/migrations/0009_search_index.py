@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+FTS_TABLE = 'accounts_searchdocument_fts'
+
+# Contentless: rows are written by accounts.search, which prefixes every
+# term with the user id.
+FTS5_SQL = (
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(terms, content='', tokenize=\"unicode61 tokenchars '_'\")"
+)
+
+
+def create_text_index(apps, schema_editor):
+    """FTS5 on SQLite builds that have it, FULLTEXT on MySQL; otherwise postings are used."""
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA compile_options')
+            if 'ENABLE_FTS5' not in {row[0] for row in cursor.fetchall()}:
+                return
+        schema_editor.execute(FTS5_SQL)
+    elif connection.vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE accounts_searchdocument ADD FULLTEXT INDEX searchdoc_body_ft (body)')
+
+
+def drop_text_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    elif connection.vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE accounts_searchdocument DROP INDEX searchdoc_body_ft')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_admin_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('message', 'Chat message'), ('transaction', 'Transaction')], max_length=12)),
+                ('object_id', models.BigIntegerField()),
+                ('reference', models.UUIDField()),
+                ('label', models.CharField(max_length=10)),
+                ('body', models.TextField()),
+                ('length', models.PositiveIntegerField(default=0)),
+                ('timestamp', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'timestamp'], name='searchdoc_kind_ts_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id', 'user'), name='searchdoc_object_user_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('frequency', models.PositiveIntegerField()),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='accounts.searchdocument')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'term'], name='searchposting_user_term_idx')],
+            },
+        ),
+        migrations.RunPython(create_text_index, drop_text_index),
+    ]
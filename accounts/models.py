@@ -1,9 +1,12 @@
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
-from django.db import models
+from django.db import IntegrityError, models
 import random
 from django.conf import settings
 import uuid
+import hashlib
+from decimal import Decimal
 from django.utils import timezone
+from .compression import CompressedTextField
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -59,10 +62,16 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     
 from django.conf import settings
 
+def default_currency():
+    return settings.DEFAULT_CURRENCY
+
 class Wallet(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='wallet')
     wallet_number = models.CharField(max_length=6, unique=True, blank=True)
     balance = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    # `balance` is held in the wallet's primary currency; other currencies
+    # live in WalletBalance rows.
+    currency = models.CharField(max_length=3, default=default_currency)
 
     def save(self, *args, **kwargs):
         if not self.wallet_number:
@@ -79,8 +88,22 @@ class Wallet(models.Model):
         return f"{self.user.email} Wallet {self.wallet_number} - Balance: {self.balance}"
 
 
+class WalletBalance(models.Model):
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='balances')
+    currency = models.CharField(max_length=3)
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['wallet', 'currency'], name='walletbalance_wallet_currency_unique'),
+        ]
+
+    def __str__(self):
+        return f"Wallet {self.wallet.wallet_number} {self.currency} balance: {self.balance}"
+
 
-from django.db.models.signals import post_save
+
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 @receiver(post_save, sender=CustomUser)
@@ -89,29 +112,151 @@ def create_user_wallet(sender, instance, created, **kwargs):
         from .models import Wallet
         Wallet.objects.create(user=instance)
 
+@receiver(post_save, sender=CustomUser)
+def update_wallet_directory_name(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and 'full_name' not in update_fields):
+        return
+    from . import directory
+    wallet_number = Wallet.objects.filter(user=instance).values_list('wallet_number', flat=True).first()
+    if wallet_number:
+        directory.update(wallet_number, instance.pk, instance.full_name)
+
+@receiver(post_save, sender=Wallet)
+def add_wallet_to_directory(sender, instance, created, **kwargs):
+    # Balance updates don't change the directory, so only new wallets are written.
+    if created:
+        from . import directory
+        directory.update(instance.wallet_number, instance.user_id, instance.user.full_name)
+
+@receiver(post_delete, sender=Wallet)
+def remove_wallet_from_directory(sender, instance, **kwargs):
+    from . import directory
+    directory.forget(instance.wallet_number)
+
 
 
 
 class Transaction(models.Model):
+    KIND_CHOICES = [
+        ('transfer', 'Transfer'),
+        ('deposit', 'Deposit'),
+    ]
+
     transaction_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    # Deposits are recorded with the depositing user as both sender and receiver.
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='transfer')
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='sent_transactions')
     receiver = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='received_transactions')
     amount = models.DecimalField(max_digits=12, decimal_places=2)
+    currency = models.CharField(max_length=3, default=default_currency)
+    # For cross-currency transfers, what the receiver was credited and the
+    # rate-table version that priced it.
+    received_amount = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+    received_currency = models.CharField(max_length=3, blank=True, null=True)
+    fx_rate = models.DecimalField(max_digits=18, decimal_places=8, blank=True, null=True)
+    fx_rate_version = models.CharField(max_length=64, blank=True, null=True)
     receiver_name = models.CharField(max_length=255)
     receiver_account_number = models.CharField(max_length=20)
     description = models.TextField(blank=True, null=True)
     timestamp = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        # History is always read newest-first for one user, so these indexes
+        # let a month-bounded query touch only the matching partition range.
+        indexes = [
+            models.Index(fields=['sender', '-timestamp'], name='txn_sender_ts_idx'),
+            models.Index(fields=['receiver', '-timestamp'], name='txn_receiver_ts_idx'),
+            models.Index(fields=['timestamp'], name='txn_ts_idx'),
+            # Admin search: exact account number and receiver name prefix.
+            models.Index(fields=['receiver_account_number', '-timestamp'], name='txn_receiver_acct_ts_idx'),
+            models.Index(fields=['receiver_name'], name='txn_receiver_name_idx'),
+        ]
+
     def __str__(self):
         return f"Transaction {self.transaction_id} from {self.sender.email} to {self.receiver.email}"
     
+class PromptTemplateManager(models.Manager):
+    _cache = {}
+
+    def get_for_content(self, name, content):
+        """Return the template for ``content``, creating a new version if it changed."""
+        checksum = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        template = self._cache.get(checksum)
+        if template is None:
+            template = self.filter(checksum=checksum).first() or self._create_version(name, content, checksum)
+            self._cache[checksum] = template
+            self._cache[template.pk] = template
+        return template
+
+    def _create_version(self, name, content, checksum, attempts=3):
+        # Workers race to store the same new content (get_or_create re-reads
+        # the winner's row) or different contents under one name, where the
+        # loser takes the next version number.
+        for attempt in range(attempts):
+            latest = self.filter(name=name).order_by('-version').values_list('version', flat=True).first()
+            try:
+                return self.get_or_create(
+                    checksum=checksum, defaults={'name': name, 'version': (latest or 0) + 1, 'content': content},
+                )[0]
+            except IntegrityError:
+                if attempt == attempts - 1:
+                    raise
+
+    def get_cached(self, pk):
+        # Templates never change once stored, so they can be cached per process.
+        template = self._cache.get(pk)
+        if template is None:
+            template = self.get(pk=pk)
+            self._cache[pk] = template
+        return template
+
+
+class PromptTemplate(models.Model):
+    name = models.CharField(max_length=100)
+    version = models.PositiveIntegerField()
+    content = models.TextField()
+    checksum = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = PromptTemplateManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'version'], name='prompttemplate_name_version_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class CompressionDictionary(models.Model):
+    CODEC_CHOICES = [
+        ('zlib', 'zlib'),
+        ('zstd', 'zstd'),
+    ]
+
+    codec = models.CharField(max_length=10, choices=CODEC_CHOICES)
+    data = models.BinaryField()
+    sample_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.codec} dictionary {self.pk} ({len(self.data)} bytes)"
+
+
 class ChatSession(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='chat_sessions')
+    prompt = models.ForeignKey(PromptTemplate, on_delete=models.PROTECT, related_name='sessions', blank=True, null=True)
     session_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     title = models.CharField(max_length=255, blank=True, null=True)  # Optional title for the chat session
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-updated_at'], name='chatsession_user_updated_idx'),
+        ]
+
     def __str__(self):
         return f"ChatSession {self.session_id} for {self.user.email}"
 
@@ -124,8 +269,112 @@ class ChatMessage(models.Model):
 
     chat_session = models.ForeignKey(ChatSession, on_delete=models.CASCADE, related_name='messages')
     role = models.CharField(max_length=10, choices=ROLE_CHOICES)
-    content = models.TextField()
+    content = CompressedTextField()
     timestamp = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['chat_session', 'timestamp'], name='chatmsg_session_ts_idx'),
+            models.Index(fields=['timestamp'], name='chatmsg_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.role} message at {self.timestamp} in session {self.chat_session.session_id}"
+
+
+@receiver(post_save, sender=ChatMessage)
+def index_chat_message(sender, instance, created, **kwargs):
+    if created:
+        from . import search
+        search.index_message(instance)
+
+@receiver(post_save, sender=Transaction)
+def index_transaction(sender, instance, created, **kwargs):
+    if created:
+        from . import search
+        search.index_transaction(instance)
+
+
+class LedgerBalance(models.Model):
+    """Expected balance per user and currency, as of the last reconciliation run."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='ledger_balances')
+    currency = models.CharField(max_length=3)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'currency'], name='ledgerbalance_user_currency_unique'),
+        ]
+
+    def __str__(self):
+        return f"Ledger {self.user_id} {self.currency}: {self.amount}"
+
+
+class ReconciliationRun(models.Model):
+    MODE_CHOICES = [
+        ('full', 'Full'),
+        ('incremental', 'Incremental'),
+        ('adopt', 'Adopt current balances'),
+    ]
+
+    mode = models.CharField(max_length=12, choices=MODE_CHOICES)
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    # Checkpoint: every Transaction up to this id is included in LedgerBalance.
+    last_transaction_id = models.BigIntegerField(default=0)
+    transactions_processed = models.BigIntegerField(default=0)
+    balances_checked = models.PositiveIntegerField(default=0)
+    mismatches = models.JSONField(default=list, blank=True)
+
+    def __str__(self):
+        return f"{self.mode} reconciliation {self.pk} up to transaction {self.last_transaction_id}"
+
+
+class SearchDocument(models.Model):
+    """A chat message or transaction, as searchable by one user."""
+    KIND_CHOICES = [
+        ('message', 'Chat message'),
+        ('transaction', 'Transaction'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='search_documents')
+    kind = models.CharField(max_length=12, choices=KIND_CHOICES)
+    # Not foreign keys: the source tables are partitioned on MySQL.
+    object_id = models.BigIntegerField()
+    # The chat session or transaction id, as the API exposes them.
+    reference = models.UUIDField()
+    # Message role or transaction kind.
+    label = models.CharField(max_length=10)
+    # Empty for chat messages except on MySQL; see accounts.search.
+    body = models.TextField()
+    # Words in body, for BM25 length normalisation.
+    length = models.PositiveIntegerField(default=0)
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'timestamp'], name='searchdoc_kind_ts_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id', 'user'], name='searchdoc_object_user_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} for user {self.user_id}"
+
+
+class SearchPosting(models.Model):
+    """Term frequency per document; the inverted index when no database one is available."""
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='postings')
+    # Copied from the document so a term lookup stays within one user.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    term = models.CharField(max_length=64)
+    frequency = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'term'], name='searchposting_user_term_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.role} message at {self.timestamp} in session {self.chat_session.session_id}"
\ No newline at end of file
+        return f"{self.term} x{self.frequency} in document {self.document_id}"
@@ -0,0 +1,296 @@
+"""
+Monthly partitioning and archival for Transaction and ChatMessage.
+
+On MySQL the tables are natively partitioned with ``RANGE COLUMNS(timestamp)``,
+one partition per month. Everywhere else the monthly periods are logical: reads
+are bounded by month on the timestamp indexes, and cold months are moved out of
+the table into compressed, append-only archive files under
+``settings.ARCHIVE_ROOT``. Archived months stay readable for statements.
+"""
+import gzip
+import json
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from . import search
+from .models import ChatMessage, Transaction
+
+PARTITIONED_MODELS = (Transaction, ChatMessage)
+
+
+def month_start(value):
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value, months):
+    years, month = divmod(value.month - 1 + months, 12)
+    return value.replace(year=value.year + years, month=month + 1)
+
+
+def parse_month(value):
+    """Parse ``YYYY-MM`` into the aware datetime at the start of that month."""
+    month = datetime.strptime(value, '%Y-%m')
+    return timezone.make_aware(month, timezone.get_default_timezone())
+
+
+def month_label(value):
+    return value.strftime('%Y-%m')
+
+
+def month_range(month):
+    """Return ``(start, end)`` bounds for the month containing ``month``."""
+    start = month_start(month)
+    return start, add_months(start, 1)
+
+
+def live_cutoff(now=None):
+    """Start of the oldest month still kept in the live tables."""
+    now = timezone.localtime(now or timezone.now())
+    return add_months(month_start(now), -(settings.PARTITION_LIVE_MONTHS - 1))
+
+
+# --------------------------------------------------------------------------
+# Native MySQL partitions
+# --------------------------------------------------------------------------
+
+def _partition_name(month):
+    return f"p{month.strftime('%Y%m')}"
+
+
+def native_partitioning_available():
+    return connection.vendor == 'mysql'
+
+
+def existing_partitions(model):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL",
+            [model._meta.db_table],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def _foreign_keys(table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT CONSTRAINT_NAME FROM information_schema.TABLE_CONSTRAINTS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND CONSTRAINT_TYPE = 'FOREIGN KEY'",
+            [table],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _partition_clause(month):
+    # Timestamps are stored in UTC, so the boundaries must be too.
+    _, end = month_range(month)
+    end = end.astimezone(dt_timezone.utc)
+    return f"PARTITION {_partition_name(month)} VALUES LESS THAN ('{end:%Y-%m-%d %H:%M:%S}')"
+
+
+def partition_table(model, first_month, months_ahead):
+    """
+    Convert ``model``'s table to monthly RANGE partitions.
+
+    MySQL requires the partition column in every unique key and does not allow
+    foreign keys on partitioned tables, so the primary key becomes
+    ``(id, timestamp)``, unique columns are widened with ``timestamp`` and the
+    foreign key constraints are dropped (Django still enforces the relations).
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    statements = [
+        f"ALTER TABLE {table} DROP FOREIGN KEY {connection.ops.quote_name(name)}"
+        for name in _foreign_keys(model._meta.db_table)
+    ]
+    alter = ["DROP PRIMARY KEY, ADD PRIMARY KEY (`id`, `timestamp`)"]
+    for field in model._meta.local_fields:
+        if field.unique and not field.primary_key:
+            column = field.column
+            alter.append(f"DROP INDEX `{column}`, ADD UNIQUE KEY `{column}_ts` (`{column}`, `timestamp`)")
+    statements.append(f"ALTER TABLE {table} {', '.join(alter)}")
+
+    last_month = add_months(month_start(timezone.localtime()), months_ahead)
+    clauses = []
+    month = month_start(first_month)
+    while month <= last_month:
+        clauses.append(_partition_clause(month))
+        month = add_months(month, 1)
+    clauses.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    statements.append(f"ALTER TABLE {table} PARTITION BY RANGE COLUMNS(`timestamp`) ({', '.join(clauses)})")
+
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def add_future_partitions(model, months_ahead):
+    """Split ``pmax`` so that partitions exist ``months_ahead`` months out."""
+    existing = existing_partitions(model)
+    table = connection.ops.quote_name(model._meta.db_table)
+    month = month_start(timezone.localtime())
+    clauses = []
+    for _ in range(months_ahead + 1):
+        if _partition_name(month) not in existing:
+            clauses.append(_partition_clause(month))
+        month = add_months(month, 1)
+    if not clauses:
+        return 0
+    clauses.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {table} REORGANIZE PARTITION pmax INTO ({', '.join(clauses)})")
+    return len(clauses) - 1
+
+
+def drop_month(model, month):
+    """Remove a whole month from the live table, by partition when possible."""
+    start, end = month_range(month)
+    # Search documents are not partitioned, so they are always deleted by row.
+    search.forget_range(model, start, end)
+    if native_partitioning_available() and _partition_name(month) in existing_partitions(model):
+        table = connection.ops.quote_name(model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {table} DROP PARTITION {_partition_name(month)}")
+        return
+    queryset = model.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    batch_size = settings.ARCHIVE_BATCH_SIZE
+    while True:
+        ids = list(queryset.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        model.objects.filter(id__in=ids).delete()
+
+
+# --------------------------------------------------------------------------
+# Archive files
+# --------------------------------------------------------------------------
+
+def archive_path(model, month):
+    return Path(settings.ARCHIVE_ROOT) / model._meta.db_table / f"{month_label(month)}.jsonl.gz"
+
+
+def archived_months(model):
+    directory = Path(settings.ARCHIVE_ROOT) / model._meta.db_table
+    if not directory.exists():
+        return []
+    return sorted(parse_month(path.name.split('.')[0]) for path in directory.glob('*.jsonl.gz'))
+
+
+def _transaction_record(txn):
+    return {
+        'id': txn.id,
+        'transaction_id': str(txn.transaction_id),
+        'kind': txn.kind,
+        'sender_id': txn.sender_id,
+        'receiver_id': txn.receiver_id,
+        'sender_name': txn.sender.full_name,
+        'receiver_name_display': txn.receiver.full_name,
+        'amount': str(txn.amount),
+        'currency': txn.currency,
+        'received_amount': None if txn.received_amount is None else str(txn.received_amount),
+        'received_currency': txn.received_currency,
+        'fx_rate': None if txn.fx_rate is None else str(txn.fx_rate),
+        'fx_rate_version': txn.fx_rate_version,
+        'receiver_name': txn.receiver_name,
+        'receiver_account_number': txn.receiver_account_number,
+        'description': txn.description,
+        'timestamp': txn.timestamp.isoformat(),
+    }
+
+
+def _chat_message_record(message):
+    return {
+        'id': message.id,
+        'session_id': str(message.chat_session.session_id),
+        'user_id': message.chat_session.user_id,
+        'role': message.role,
+        'content': message.content,
+        'timestamp': message.timestamp.isoformat(),
+    }
+
+
+_RECORDS = {
+    Transaction: (_transaction_record, ('sender', 'receiver')),
+    ChatMessage: (_chat_message_record, ('chat_session',)),
+}
+
+
+def archive_month(model, month):
+    """
+    Append every row of ``model`` in ``month`` to its archive file.
+
+    Each run writes a new gzip member, so existing archive data is never
+    rewritten. Returns the number of rows archived.
+    """
+    to_record, related = _RECORDS[model]
+    start, end = month_range(month)
+    queryset = (
+        model.objects.filter(timestamp__gte=start, timestamp__lt=end)
+        .select_related(*related)
+        .order_by('id')
+    )
+    path = archive_path(model, month)
+    archive = None
+    count = 0
+    try:
+        for row in queryset.iterator(chunk_size=settings.ARCHIVE_BATCH_SIZE):
+            if archive is None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                archive = gzip.open(path, 'at', encoding='utf-8')
+            archive.write(json.dumps(to_record(row)) + '\n')
+            count += 1
+    finally:
+        if archive is not None:
+            archive.close()
+    return count
+
+
+def read_archive(model, month):
+    path = archive_path(model, month)
+    if not path.exists():
+        return
+    with gzip.open(path, 'rt', encoding='utf-8') as archive:
+        for line in archive:
+            yield json.loads(line)
+
+
+def archived_transactions(user, month):
+    """Archived transactions for ``user`` in ``month``, newest first."""
+    records = []
+    seen = set()
+    for record in read_archive(Transaction, month):
+        # A month re-archived after an interrupted run appears twice.
+        if record['id'] in seen:
+            continue
+        seen.add(record['id'])
+        kind = record.get('kind', 'transfer')
+        if kind == 'deposit' and record['receiver_id'] == user.id:
+            direction = 'deposit'
+        elif record['sender_id'] == user.id:
+            direction = 'outgoing'
+        elif record['receiver_id'] == user.id:
+            direction = 'incoming'
+        else:
+            continue
+        records.append({
+            'transaction_id': record['transaction_id'],
+            'kind': kind,
+            'sender_name': record['sender_name'],
+            'receiver_name_display': record['receiver_name_display'],
+            'amount': record['amount'],
+            'currency': record.get('currency', settings.DEFAULT_CURRENCY),
+            'received_amount': record.get('received_amount'),
+            'received_currency': record.get('received_currency'),
+            'fx_rate': record.get('fx_rate'),
+            'fx_rate_version': record.get('fx_rate_version'),
+            'receiver_name': record['receiver_name'],
+            'receiver_account_number': record['receiver_account_number'],
+            'description': record['description'],
+            'timestamp': datetime.fromisoformat(record['timestamp']),
+            'transaction_direction': direction,
+        })
+    records.sort(key=lambda record: record['timestamp'], reverse=True)
+    return records
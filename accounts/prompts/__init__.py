@@ -0,0 +1,19 @@
+"""
+System prompts for the chat assistant.
+
+Each prompt is a ``<name>.txt`` file in this package, read on first use and
+cached for the life of the process.
+"""
+from functools import cache
+from pathlib import Path
+
+PROMPT_DIR = Path(__file__).resolve().parent
+
+
+def names():
+    return sorted(path.stem for path in PROMPT_DIR.glob('*.txt'))
+
+
+@cache
+def load(name):
+    return (PROMPT_DIR / f'{name}.txt').read_text(encoding='utf-8')
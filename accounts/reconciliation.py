@@ -0,0 +1,264 @@
+"""
+Balance reconciliation against the transaction ledger.
+
+Every movement of money is a ``Transaction`` row: transfers debit the sender
+in ``currency`` and credit the receiver ``received_amount`` in
+``received_currency``; deposits only credit. Summing those per user and
+currency gives the balance each wallet should hold, which is compared with
+``Wallet.balance`` and the ``WalletBalance`` rows.
+
+Work is sharded by owner user id (wallets are one per user) and each shard
+streams its rows in id order, ``chunk_size`` at a time. Amounts are summed in
+integer cents, with NumPy when it is installed and plain dicts otherwise.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from . import partitioning
+from .models import LedgerBalance, Transaction, Wallet, WalletBalance
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+LEDGER_COLUMNS = (
+    'id', 'kind', 'sender_id', 'receiver_id', 'amount', 'currency', 'received_amount', 'received_currency',
+)
+
+
+def to_cents(value):
+    return int(Decimal(value) * 100)
+
+
+def from_cents(cents):
+    return Decimal(cents) / 100
+
+
+def user_shards(low, high, count):
+    """Split user ids ``low..high`` into ``count`` half-open ranges."""
+    size = max(1, -(-(high - low + 1) // count))
+    return [(start, min(start + size, high + 1)) for start in range(low, high + 1, size)]
+
+
+def settled_transaction_id(now):
+    """
+    The checkpoint for a run starting at ``now``: the id of the newest
+    transaction timestamped ``RECONCILE_SETTLE_SECONDS`` before it.
+
+    Ids are allocated at insert but rows only become visible at commit, so a
+    transfer can commit after one with a higher id and would be skipped by a
+    checkpoint at ``Max('id')``. Every row with a lower id than the settled
+    one was inserted before it and has committed or rolled back since.
+    Newer rows are picked up by the next run (and by ``recheck``).
+    """
+    cutoff = now - timedelta(seconds=settings.RECONCILE_SETTLE_SECONDS)
+    return (
+        Transaction.objects.filter(timestamp__lt=cutoff).order_by('-timestamp').values_list('id', flat=True).first()
+        or 0
+    )
+
+
+def _shard_rows(lo, hi, after_id, upto_id, chunk_size):
+    """Yield the shard's rows in id-ordered chunks using keyset pagination."""
+    queryset = Transaction.objects.filter(
+        Q(sender_id__gte=lo, sender_id__lt=hi) | Q(receiver_id__gte=lo, receiver_id__lt=hi),
+    )
+    if upto_id is not None:
+        queryset = queryset.filter(id__lte=upto_id)
+    last_id = after_id
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).order_by('id').values_list(*LEDGER_COLUMNS)[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+class _ArrayTotals:
+    """Dense ``currency x user`` cent totals for one shard."""
+
+    def __init__(self, lo, hi):
+        self.lo = lo
+        self.width = hi - lo
+        self.currencies = {}
+        self.totals = np.zeros((0, self.width), dtype=np.int64)
+
+    def _codes(self, values):
+        codes = np.empty(len(values), dtype=np.int64)
+        for index, code in enumerate(values):
+            row = self.currencies.get(code)
+            if row is None:
+                row = self.currencies[code] = len(self.currencies)
+                self.totals = np.vstack([self.totals, np.zeros((1, self.width), dtype=np.int64)])
+            codes[index] = row
+        return codes
+
+    def add(self, rows):
+        _, kinds, senders, receivers, amounts, currencies, received, received_currencies = zip(*rows)
+        hi = self.lo + self.width
+        senders = np.array(senders, dtype=np.int64)
+        receivers = np.array(receivers, dtype=np.int64)
+        debit_cents = np.rint(np.array(amounts, dtype=float) * 100).astype(np.int64)
+        credit_cents = np.rint(np.array(
+            [amount if value is None else value for amount, value in zip(amounts, received)], dtype=float,
+        ) * 100).astype(np.int64)
+        debit_currency = self._codes(currencies)
+        credit_currency = self._codes(
+            [currency if value is None else value for currency, value in zip(currencies, received_currencies)]
+        )
+        transfers = np.array([kind == 'transfer' for kind in kinds])
+        debit = transfers & (senders >= self.lo) & (senders < hi)
+        credit = (receivers >= self.lo) & (receivers < hi)
+        np.add.at(self.totals, (debit_currency[debit], senders[debit] - self.lo), -debit_cents[debit])
+        np.add.at(self.totals, (credit_currency[credit], receivers[credit] - self.lo), credit_cents[credit])
+
+    def result(self):
+        names = {row: code for code, row in self.currencies.items()}
+        rows, columns = np.nonzero(self.totals)
+        return {
+            (int(column) + self.lo, names[int(row)]): int(self.totals[row, column])
+            for row, column in zip(rows, columns)
+        }
+
+
+class _DictTotals:
+    def __init__(self, lo, hi):
+        self.lo = lo
+        self.hi = hi
+        self.totals = defaultdict(int)
+
+    def add(self, rows):
+        apply_rows(self.totals, rows, self.lo, self.hi)
+
+    def result(self):
+        return {key: cents for key, cents in self.totals.items() if cents}
+
+
+def apply_rows(totals, rows, lo=None, hi=None):
+    """Add ledger ``rows`` to ``totals``, keeping only users in ``lo..hi``."""
+    def wanted(user_id):
+        return lo is None or lo <= user_id < hi
+
+    for _, kind, sender_id, receiver_id, amount, currency, received, received_currency in rows:
+        if kind == 'transfer' and wanted(sender_id):
+            totals[(sender_id, currency)] -= to_cents(amount)
+        if wanted(receiver_id):
+            credit = amount if received is None else received
+            totals[(receiver_id, received_currency or currency)] += to_cents(credit)
+
+
+def reconcile_shard(lo, hi, after_id, upto_id, chunk_size):
+    """
+    Net movement per ``(user_id, currency)`` in cents for users ``lo..hi``,
+    over transactions with ``after_id < id <= upto_id``.
+
+    Returns ``(rows_read, deltas)``. Runs in worker processes, so it only
+    takes and returns plain values.
+    """
+    totals = (_ArrayTotals if np is not None else _DictTotals)(lo, hi)
+    count = 0
+    for rows in _shard_rows(lo, hi, after_id, upto_id, chunk_size):
+        totals.add(rows)
+        count += len(rows)
+    return count, totals.result()
+
+
+def archived_deltas():
+    """Net movement from transactions already moved out to archive files."""
+    totals = defaultdict(int)
+    for month in partitioning.archived_months(Transaction):
+        seen = set()
+        rows = []
+        for record in partitioning.read_archive(Transaction, month):
+            if record['id'] in seen:
+                continue
+            seen.add(record['id'])
+            rows.append((
+                record['id'], record.get('kind', 'transfer'), record['sender_id'], record['receiver_id'],
+                record['amount'], record.get('currency', settings.DEFAULT_CURRENCY),
+                record.get('received_amount'), record.get('received_currency'),
+            ))
+        apply_rows(totals, rows)
+    return totals
+
+
+def current_balances(user_ids=None, lock=False):
+    """Actual balances as ``{(user_id, currency): cents}``."""
+    wallets = Wallet.objects.all()
+    sub_balances = WalletBalance.objects.all()
+    if user_ids is not None:
+        wallets = wallets.filter(user_id__in=user_ids)
+        sub_balances = sub_balances.filter(wallet__user_id__in=user_ids)
+    if lock:
+        wallets = wallets.select_for_update()
+        sub_balances = sub_balances.select_for_update()
+    balances = {}
+    for user_id, currency, balance in wallets.values_list('user_id', 'currency', 'balance').iterator():
+        balances[(user_id, currency)] = to_cents(balance)
+    for user_id, currency, balance in sub_balances.values_list('wallet__user_id', 'currency', 'balance').iterator():
+        balances[(user_id, currency)] = balances.get((user_id, currency), 0) + to_cents(balance)
+    return balances
+
+
+def ledger_balances(user_ids=None):
+    queryset = LedgerBalance.objects.all()
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+    return {
+        (user_id, currency): to_cents(amount)
+        for user_id, currency, amount in queryset.values_list('user_id', 'currency', 'amount').iterator()
+    }
+
+
+def compare(expected, actual):
+    """List ``(user_id, currency, expected_cents, actual_cents)`` that disagree."""
+    return [
+        (key[0], key[1], expected.get(key, 0), actual.get(key, 0))
+        for key in sorted(expected.keys() | actual.keys())
+        if expected.get(key, 0) != actual.get(key, 0)
+    ]
+
+
+def recheck(mismatches, expected, upto_id):
+    """
+    Re-verify suspected mismatches with the users' wallets locked.
+
+    Transfers that landed after the scan started show up as false positives,
+    so rows past ``upto_id`` are folded in before comparing again.
+    """
+    user_ids = sorted({user_id for user_id, *_ in mismatches})
+    with transaction.atomic():
+        actual = current_balances(user_ids, lock=True)
+        later = defaultdict(int)
+        rows = (
+            Transaction.objects.filter(Q(sender_id__in=user_ids) | Q(receiver_id__in=user_ids), id__gt=upto_id)
+            .order_by('id').values_list(*LEDGER_COLUMNS)
+        )
+        apply_rows(later, rows.iterator())
+    wanted = set(user_ids)
+    settled = {key: expected.get(key, 0) + later.get(key, 0) for key in expected.keys() | later.keys()}
+    actual = {key: cents for key, cents in actual.items() if key[0] in wanted}
+    return [row for row in compare(settled, actual) if row[0] in wanted]
+
+
+def save_ledger(expected, replace=False):
+    """Store expected balances; ``replace`` drops rows no longer present."""
+    with transaction.atomic():
+        if replace:
+            LedgerBalance.objects.all().delete()
+        LedgerBalance.objects.bulk_create(
+            [
+                LedgerBalance(user_id=user_id, currency=currency, amount=from_cents(cents))
+                for (user_id, currency), cents in expected.items()
+            ],
+            batch_size=2000,
+            update_conflicts=True,
+            unique_fields=['user', 'currency'],
+            update_fields=['amount'],
+        )
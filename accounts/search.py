@@ -0,0 +1,405 @@
+"""
+Full-text search over chat messages and transaction descriptions.
+
+Every searchable row gets a ``SearchDocument`` per user who can see it (both
+parties of a transfer): the source tables are partitioned on MySQL, where
+neither FULLTEXT indexes nor foreign keys are available. Documents are written
+when messages and transactions are created and removed when their month is
+archived. Transaction documents hold their plain text. Message documents
+only do on MySQL, whose FULLTEXT index can only cover a column of its own
+table; elsewhere the index is built from the message when it is created and
+snippets are cut from the compressed message itself, so chat text is not
+stored twice.
+
+The inverted index itself depends on the database:
+
+* ``fts5``: a contentless SQLite FTS5 table, ranked with ``bm25()``. Every
+  term is indexed as ``<user id>_<term>``, so each user has their own posting
+  lists: a common word costs what it costs within one user's history, not
+  across everyone's, and ranking statistics are per user.
+* ``mysql``: a FULLTEXT index on ``SearchDocument.body``.
+* ``python``: term postings in ``SearchPosting``, ranked with BM25 here. Used
+  on any other database, or when ``SEARCH_BACKEND = 'python'``.
+
+Queries match documents containing every word; snippets are highlighted here
+for all backends so results look the same everywhere.
+"""
+import math
+import re
+import unicodedata
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, connections, router
+from django.db.models import Count, Sum
+from django.utils.html import escape
+
+from .models import ChatMessage, SearchDocument, SearchPosting
+
+FTS_TABLE = 'accounts_searchdocument_fts'
+
+# BM25 parameters, the same defaults FTS5 uses.
+K1 = 1.2
+B = 0.75
+
+# Letters and digits, the token characters of FTS5's unicode61 tokenizer.
+WORD = re.compile(r'[^\W_]+')
+MAX_QUERY_TERMS = 8
+# Above this many, the python backend intersects postings here rather than in SQL.
+MAX_CANDIDATES = 1000
+
+_backend = None
+
+
+def normalize(word):
+    """Lowercase and strip accents, as FTS5's ``remove_diacritics`` does."""
+    word = unicodedata.normalize('NFKD', word.lower())
+    return ''.join(char for char in word if not unicodedata.combining(char))
+
+
+def tokenize(text):
+    return [normalize(word) for word in WORD.findall(text or '')]
+
+
+def query_terms(query):
+    """Distinct words of a search query, in order, at most ``MAX_QUERY_TERMS``."""
+    return list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+
+
+def document_text(document):
+    """The text ``document`` was indexed from; see ``load_message_text``."""
+    return getattr(document, 'text', None) or document.body
+
+
+def load_message_text(documents):
+    """
+    Attach ``text`` to message documents stored without a body, read from
+    their chat messages; None when the message no longer exists.
+    """
+    missing = [
+        document for document in documents
+        if document.kind == 'message' and not document.body and not hasattr(document, 'text')
+    ]
+    if not missing:
+        return
+    messages = ChatMessage.objects.only('content').in_bulk([document.object_id for document in missing])
+    for document in missing:
+        message = messages.get(document.object_id)
+        document.text = message.content if message is not None else None
+
+
+def index_terms(document):
+    """The FTS5 text of ``document``: its words, each prefixed with the user id."""
+    return ' '.join(f'{document.user_id}_{term}' for term in tokenize(document_text(document)))
+
+
+def _fts5_table_exists():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+def backend():
+    """The index in use: ``settings.SEARCH_BACKEND`` or, for 'auto', the database's own."""
+    global _backend
+    if _backend is None:
+        configured = settings.SEARCH_BACKEND
+        if configured != 'auto':
+            _backend = configured
+        elif connection.vendor == 'mysql':
+            _backend = 'mysql'
+        elif connection.vendor == 'sqlite' and _fts5_table_exists():
+            _backend = 'fts5'
+        else:
+            _backend = 'python'
+    return _backend
+
+
+# --------------------------------------------------------------------------
+# Indexing
+# --------------------------------------------------------------------------
+
+def message_documents(message, user_id):
+    if not message.content:
+        return []
+    document = SearchDocument(
+        user_id=user_id,
+        kind='message',
+        object_id=message.pk,
+        reference=message.chat_session.session_id,
+        label=message.role,
+        body=message.content if backend() == 'mysql' else '',
+        length=len(tokenize(message.content)),
+        timestamp=message.timestamp,
+    )
+    document.text = message.content
+    return [document]
+
+
+def transaction_documents(txn):
+    body = '\n'.join(part for part in (txn.description, txn.receiver_name) if part)
+    if not body:
+        return []
+    # Deposits have the same user on both sides.
+    user_ids = dict.fromkeys((txn.sender_id, txn.receiver_id))
+    length = len(tokenize(body))
+    return [
+        SearchDocument(
+            user_id=user_id,
+            kind='transaction',
+            object_id=txn.pk,
+            reference=txn.transaction_id,
+            label=txn.kind,
+            body=body,
+            length=length,
+            timestamp=txn.timestamp,
+        )
+        for user_id in user_ids
+    ]
+
+
+def add_documents(documents, batch_size=2000):
+    """Store new documents and add them to the index."""
+    if not documents:
+        return
+    active = backend()
+    if active == 'python' and not connection.features.can_return_rows_from_bulk_insert:
+        # Postings need the document ids.
+        for document in documents:
+            document.save()
+    else:
+        SearchDocument.objects.bulk_create(documents, batch_size=batch_size)
+    if active == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE}(rowid, terms) VALUES (%s, %s)",
+                [(document.pk, index_terms(document)) for document in documents],
+            )
+    elif active == 'python':
+        SearchPosting.objects.bulk_create(
+            [
+                SearchPosting(document_id=document.pk, user_id=document.user_id, term=term[:64], frequency=frequency)
+                for document in documents
+                for term, frequency in Counter(tokenize(document_text(document))).items()
+            ],
+            batch_size=batch_size * 10,
+        )
+
+
+def index_message(message):
+    add_documents(message_documents(message, message.chat_session.user_id))
+
+
+def index_transaction(txn):
+    add_documents(transaction_documents(txn))
+
+
+def _delete(ids):
+    SearchPosting.objects.filter(document_id__in=ids).delete()
+    SearchDocument.objects.filter(id__in=ids).delete()
+
+
+def delete_documents(queryset, batch_size=2000):
+    """Delete documents in batches, with their postings and FTS5 rows."""
+    fts5 = backend() == 'fts5'
+    while True:
+        documents = list(queryset.only('id', 'user_id', 'kind', 'object_id', 'body')[:batch_size])
+        if not documents:
+            break
+        if fts5:
+            # A contentless table can only delete a row given the text it
+            # indexed. Rows whose message is already gone are left behind;
+            # search skips them.
+            load_message_text(documents)
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, terms) VALUES ('delete', %s, %s)",
+                    [(document.pk, index_terms(document)) for document in documents if document_text(document)],
+                )
+        _delete([document.pk for document in documents])
+
+
+def clear(batch_size=2000):
+    """Empty the index and delete every document."""
+    if backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+    while True:
+        ids = list(SearchDocument.objects.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        _delete(ids)
+
+
+def forget_range(model, start, end):
+    """Drop the documents of ``model`` rows timestamped in [start, end)."""
+    kind = 'message' if model is ChatMessage else 'transaction'
+    delete_documents(
+        SearchDocument.objects.filter(kind=kind, timestamp__gte=start, timestamp__lt=end),
+        settings.ARCHIVE_BATCH_SIZE,
+    )
+
+
+# --------------------------------------------------------------------------
+# Querying
+# --------------------------------------------------------------------------
+
+def _read_connection():
+    # Raw queries must read the same database as the ORM lookups that load
+    # the matched documents, which may be a replica.
+    return connections[router.db_for_read(SearchDocument)]
+
+
+def _fts5_ids(user_id, terms, kind, limit, offset):
+    match = ' AND '.join(f'"{user_id}_{term}"' for term in terms)
+    if kind:
+        sql = (
+            f"SELECT d.id, -bm25({FTS_TABLE}) FROM {FTS_TABLE} "
+            f"JOIN accounts_searchdocument d ON d.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s AND d.kind = %s "
+            f"ORDER BY bm25({FTS_TABLE}), d.id DESC LIMIT %s OFFSET %s"
+        )
+        params = [match, kind, limit, offset]
+    else:
+        sql = (
+            f"SELECT rowid, -bm25({FTS_TABLE}) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s ORDER BY bm25({FTS_TABLE}), rowid DESC LIMIT %s OFFSET %s"
+        )
+        params = [match, limit, offset]
+    with _read_connection().cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _mysql_ids(user_id, terms, kind, limit, offset):
+    # Boolean mode so every word is required, as with the other backends.
+    # Words shorter than innodb_ft_min_token_size are not indexed at all.
+    against = ' '.join(f'+{term}' for term in terms if len(term) >= 3)
+    if not against:
+        return []
+    kind_clause = 'AND kind = %s' if kind else ''
+    sql = (
+        "SELECT id, MATCH(body) AGAINST (%s IN BOOLEAN MODE) AS score "
+        "FROM accounts_searchdocument "
+        f"WHERE user_id = %s AND MATCH(body) AGAINST (%s IN BOOLEAN MODE) {kind_clause} "
+        "ORDER BY score DESC, id DESC LIMIT %s OFFSET %s"
+    )
+    params = [against, user_id, against] + ([kind] if kind else []) + [limit, offset]
+    with _read_connection().cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _python_ids(user_id, terms, kind, limit, offset):
+    documents = SearchDocument.objects.filter(user_id=user_id)
+    postings = SearchPosting.objects.filter(user_id=user_id)
+    if kind:
+        documents = documents.filter(kind=kind)
+        postings = postings.filter(document__kind=kind)
+    terms = [term[:64] for term in terms]
+    # Document frequencies come straight off the (user, term) index. Reading
+    # postings rarest term first keeps a rare word from loading common ones.
+    document_frequency = {term: postings.filter(term=term).count() for term in terms}
+    if not all(document_frequency.values()):
+        return []
+    rarest, *others = sorted(terms, key=document_frequency.get)
+    matched = {}
+    lengths = {}
+    for doc_id, frequency, length in postings.filter(term=rarest).values_list(
+            'document_id', 'frequency', 'document__length'):
+        matched[doc_id] = {rarest: frequency}
+        lengths[doc_id] = length
+    for term in others:
+        term_postings = postings.filter(term=term)
+        if len(matched) <= MAX_CANDIDATES:
+            term_postings = term_postings.filter(document_id__in=list(matched))
+        found = dict(term_postings.values_list('document_id', 'frequency'))
+        matched = {doc_id: {**freqs, term: found[doc_id]} for doc_id, freqs in matched.items() if doc_id in found}
+        if not matched:
+            return []
+
+    # Statistics are per user, the collection each query actually ranks.
+    stats = documents.aggregate(total=Count('id'), length=Sum('length'))
+    total = stats['total']
+    average = stats['length'] / total or 1
+
+    def score(doc_id):
+        norm = K1 * (1 - B + B * lengths[doc_id] / average)
+        return sum(
+            math.log(1 + (total - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            * frequency * (K1 + 1) / (frequency + norm)
+            for term, frequency in matched[doc_id].items()
+        )
+
+    ranked = sorted(((doc_id, score(doc_id)) for doc_id in matched), key=lambda item: (-item[1], -item[0]))
+    return ranked[offset:offset + limit]
+
+
+_QUERIES = {'fts5': _fts5_ids, 'mysql': _mysql_ids, 'python': _python_ids}
+
+
+def snippet(body, terms, words=None):
+    """
+    The window of ``words`` words of ``body`` with the most query terms,
+    HTML-escaped, with the matching words wrapped in ``<mark>``.
+    """
+    words = words or settings.SEARCH_SNIPPET_WORDS
+    tokens = list(WORD.finditer(body))
+    if not tokens:
+        return ''
+    wanted = set(terms)
+    hits = [normalize(token.group()) in wanted for token in tokens]
+    best = 0
+    count = best_count = sum(hits[:words])
+    for start in range(1, max(len(tokens) - words + 1, 1)):
+        count += hits[start + words - 1] - hits[start - 1]
+        if count > best_count:
+            best, best_count = start, count
+    window = range(best, min(best + words, len(tokens)))
+
+    parts = ['… '] if best > 0 else []
+    position = tokens[best].start()
+    for index in window:
+        token = tokens[index]
+        parts.append(escape(body[position:token.start()]))
+        parts.append(f'<mark>{escape(token.group())}</mark>' if hits[index] else escape(token.group()))
+        position = token.end()
+    if window[-1] + 1 < len(tokens):
+        parts.append(' …')
+    else:
+        parts.append(escape(body[position:]))
+    return ''.join(parts).strip()
+
+
+def search(user, query, kind=None, page=1, page_size=None):
+    """
+    One page of ``user``'s documents matching every word of ``query``, best
+    first. Returns ``(results, has_next)``; results are dicts with a
+    highlighted snippet. There is no total count: it would cost as much as
+    ranking every match.
+    """
+    terms = query_terms(query)
+    page_size = page_size or settings.SEARCH_PAGE_SIZE
+    if not terms:
+        return [], False
+    rows = _QUERIES[backend()](user.pk, terms, kind, page_size + 1, (page - 1) * page_size)
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    documents = SearchDocument.objects.in_bulk([doc_id for doc_id, _ in rows])
+    load_message_text(documents.values())
+    results = []
+    for doc_id, score in rows:
+        # Documents deleted along with their user, or whose message is gone,
+        # leave FTS5 rows behind.
+        document = documents.get(doc_id)
+        if document is None or not document_text(document):
+            continue
+        results.append({
+            'kind': document.kind,
+            'id': document.reference,
+            'label': document.label,
+            'timestamp': document.timestamp,
+            'score': round(float(score), 4),
+            'snippet': snippet(document_text(document), terms),
+        })
+    return results, has_next
@@ -1,7 +1,9 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import authenticate
-from .models import CustomUser, Wallet, Transaction, ChatSession, ChatMessage
+from .models import CustomUser, Wallet, WalletBalance, Transaction, ChatSession, ChatMessage
 import re
+from decimal import Decimal
 
 class RegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'})
@@ -53,23 +55,41 @@ class UserInfoSerializer(serializers.ModelSerializer):
         fields = ['email', 'full_name']
 
 
+class WalletBalanceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WalletBalance
+        fields = ['currency', 'balance']
+
+
 class WalletSerializer(serializers.ModelSerializer):
+    balances = WalletBalanceSerializer(many=True, read_only=True)
+
     class Meta:
         model = Wallet
-        fields = ['wallet_number', 'balance']
+        fields = ['wallet_number', 'balance', 'currency', 'balances']
 
 class DepositSerializer(serializers.Serializer):
-    amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=Decimal('0.01'))
+    currency = serializers.CharField(max_length=3, required=False)
 
 
 
 class TransferSerializer(serializers.Serializer):
     recipient_wallet_number = serializers.CharField(max_length=6)
-    amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=Decimal('0.01'))
     description = serializers.CharField(max_length=255, required=False, allow_blank=True)
     pin = serializers.CharField(max_length=4, required=False, allow_blank=True)
+    currency = serializers.CharField(max_length=3, required=False)
     step = serializers.ChoiceField(choices=['verify', 'transfer'], default='verify')
 
+
+class BatchVerifySerializer(serializers.Serializer):
+    wallet_numbers = serializers.ListField(
+        child=serializers.CharField(max_length=6),
+        allow_empty=False,
+        max_length=settings.WALLET_VERIFY_BATCH_LIMIT,
+    )
+
     
 class TransactionSerializer(serializers.ModelSerializer):
     transaction_direction = serializers.SerializerMethodField()
@@ -80,9 +100,15 @@ class TransactionSerializer(serializers.ModelSerializer):
         model = Transaction
         fields = [
             'transaction_id',
+            'kind',
             'sender_name',
             'receiver_name_display',
             'amount',
+            'currency',
+            'received_amount',
+            'received_currency',
+            'fx_rate',
+            'fx_rate_version',
             'receiver_name',
             'receiver_account_number',
             'description',
@@ -95,6 +121,8 @@ class TransactionSerializer(serializers.ModelSerializer):
         request = self.context.get('request', None)
         if request and hasattr(request, 'user'):
             user = request.user
+            if obj.kind == 'deposit':
+                return 'deposit'
             if obj.sender == user:
                 return 'outgoing'
             elif obj.receiver == user:
@@ -102,6 +130,8 @@ class TransactionSerializer(serializers.ModelSerializer):
         return 'unknown'
     
 class ChatMessageSerializer(serializers.ModelSerializer):
+    content = serializers.CharField(read_only=True)
+
     class Meta:
         model = ChatMessage
         fields = ['id', 'role', 'content', 'timestamp']
@@ -118,3 +148,9 @@ class ChatPromptSerializer(serializers.Serializer):
     prompt = serializers.CharField(max_length=2000)
     session_id = serializers.UUIDField(required=False)
 
+
+class SearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+    kind = serializers.ChoiceField(choices=['message', 'transaction'], required=False)
+    page = serializers.IntegerField(min_value=1, default=1)
+    page_size = serializers.IntegerField(min_value=1, max_value=settings.SEARCH_MAX_PAGE_SIZE, required=False)
@@ -0,0 +1,242 @@
+"""
+Cold-start support: lazily imported views, the prefork warm-up hook and the
+probe behind the ``profile_startup`` command.
+
+Nothing here imports Django models or views at module load, so it is safe to
+use from URLconfs and server config files.
+"""
+import gc
+import io
+import json
+import os
+import time
+
+from django.utils.module_loading import import_string
+
+
+class LazyView:
+    """
+    URL callback that imports its DRF view on the first request.
+
+    ``CsrfViewMiddleware`` inspects the callback before it is called, so the
+    exemption every ``APIView`` carries is declared here up front.
+    """
+    csrf_exempt = True
+
+    def __init__(self, path, **initkwargs):
+        self.path = path
+        self.initkwargs = initkwargs
+        self._view = None
+
+    def load(self):
+        if self._view is None:
+            self._view = import_string(self.path).as_view(**self.initkwargs)
+        return self._view
+
+    @property
+    def view_class(self):
+        # Read by ReplicaRoutingMiddleware.process_view, just before the call.
+        return self.load().view_class
+
+    def __call__(self, request, *args, **kwargs):
+        return self.load()(request, *args, **kwargs)
+
+    def __repr__(self):
+        return f'<LazyView {self.path}>'
+
+
+def _lazy_views(patterns):
+    for pattern in patterns:
+        if hasattr(pattern, 'url_patterns'):
+            yield from _lazy_views(pattern.url_patterns)
+        elif isinstance(pattern.callback, LazyView):
+            yield pattern.callback
+
+
+def warmup():
+    """
+    Load read-only state before workers fork so they share it copy-on-write:
+    the URLconf and every view, the chatbot prompts, the HTTP client, the
+    FX rate table and the transfer velocity counters. Used as the gunicorn
+    ``on_starting`` hook.
+    """
+    from django.db import connections
+    from django.urls import get_resolver
+
+    import requests  # noqa: F401 - needed by the chatbot, shared once imported
+
+    from . import fx, prompts, velocity
+
+    for view in _lazy_views(get_resolver().url_patterns):
+        view.load()
+    for name in prompts.names():
+        prompts.load(name)
+    fx.get_table()
+    # Warm here rather than inside the first transfer's transaction; each
+    # worker then only syncs what was written since.
+    velocity.get_engine()
+    # Workers must open their own connections.
+    connections.close_all()
+    # Keep the preloaded objects out of later collections, which would
+    # otherwise write to (and un-share) every page they live on.
+    gc.collect()
+    gc.freeze()
+
+
+# --------------------------------------------------------------------------
+# Profiling probe, run in a fresh interpreter by ``profile_startup``
+# --------------------------------------------------------------------------
+
+def memory():
+    """Resident, proportional and private memory of this process in KiB."""
+    try:
+        with open('/proc/self/smaps_rollup') as smaps:
+            fields = dict(line.split(':', 1) for line in smaps if ':' in line)
+    except OSError:
+        import resource
+        return {'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+    def kib(name):
+        return int(fields.get(name, '0 kB').split()[0])
+    return {
+        'rss': kib('Rss'),
+        'pss': kib('Pss'),
+        'private': kib('Private_Clean') + kib('Private_Dirty'),
+    }
+
+
+def _request(application, path):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'HTTP_HOST': 'localhost',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': io.StringIO(),
+        'wsgi.url_scheme': 'http',
+    }
+    statuses = []
+    response = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        b''.join(response)
+    finally:
+        response.close()
+    return statuses[0]
+
+
+class _Clock:
+    def __init__(self):
+        self.phases = {}
+        self.apps = {}
+        self.last = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.phases[name] = now - self.last
+        self.last = now
+
+    def timed(self, label, step, method):
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.apps.setdefault(label, {})[step] = time.perf_counter() - started
+        return wrapper
+
+
+def _boot(clock):
+    """Configure Django and build the WSGI handler, timing each phase."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    import django
+    from django.apps.config import AppConfig
+    from django.conf import settings
+    clock.lap('import django')
+    settings.INSTALLED_APPS
+    clock.lap('settings')
+
+    create = AppConfig.create.__func__
+
+    def timed_create(cls, entry):
+        started = time.perf_counter()
+        config = create(cls, entry)
+        clock.apps.setdefault(config.label, {})['import'] = time.perf_counter() - started
+        config.import_models = clock.timed(config.label, 'models', config.import_models)
+        config.ready = clock.timed(config.label, 'ready', config.ready)
+        return config
+
+    AppConfig.create = classmethod(timed_create)
+    try:
+        django.setup()
+    finally:
+        AppConfig.create = classmethod(create)
+    clock.lap('django.setup')
+
+    from django.core.handlers.wsgi import WSGIHandler
+    application = WSGIHandler()
+    clock.lap('middleware')
+    return application
+
+
+def _fork_workers(count, work):
+    """Run ``work()`` in ``count`` forked children and collect their results."""
+    read_fd, write_fd = os.pipe()
+    pids = []
+    for _ in range(count):
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            try:
+                result = work()
+            except Exception as exc:
+                result = {'error': repr(exc)}
+            os.write(write_fd, (json.dumps(result) + '\n').encode())
+            os._exit(0)
+        pids.append(pid)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as results:
+        lines = results.read().splitlines()
+    for pid in pids:
+        os.waitpid(pid, 0)
+    return [json.loads(line) for line in lines]
+
+
+def profile_process(path, warm=False, workers=0):
+    """
+    Boot the app in this (fresh) process and print a JSON report.
+
+    With ``workers`` the process acts like a gunicorn master: ``warm`` boots
+    and warms up before forking, as with ``preload_app``; otherwise each
+    forked worker boots the app itself.
+    """
+    clock = _Clock()
+    report = {}
+
+    def serve(application):
+        started = time.perf_counter()
+        status = _request(application, path)
+        return {'status': status, 'first_request': time.perf_counter() - started, 'memory': memory()}
+
+    if workers and not warm:
+        def cold_worker():
+            worker_clock = _Clock()
+            result = serve(_boot(worker_clock))
+            result['boot'] = sum(worker_clock.phases.values())
+            return result
+        report['workers'] = _fork_workers(workers, cold_worker)
+    else:
+        application = _boot(clock)
+        if warm:
+            warmup()
+            clock.lap('warmup')
+        report['master_memory'] = memory()
+        if workers:
+            report['workers'] = _fork_workers(workers, lambda: serve(application))
+        else:
+            report.update(serve(application))
+    report['phases'] = clock.phases
+    report['apps'] = clock.apps
+    print(json.dumps(report))
@@ -0,0 +1,30 @@
+from django import template
+from django.contrib.admin.templatetags.base import InclusionAdminNode
+
+from accounts.changelist import CURSOR_VAR, indexed_date_hierarchy
+
+register = template.Library()
+
+
+@register.tag(name='indexed_date_hierarchy')
+def indexed_date_hierarchy_tag(parser, token):
+    return InclusionAdminNode(
+        parser, token, func=indexed_date_hierarchy, template_name='date_hierarchy.html', takes_context=False,
+    )
+
+
+def cursor_pagination(cl):
+    return {
+        'cl': cl,
+        'estimated': getattr(cl.paginator, 'is_estimate', False),
+        'capped': getattr(cl.paginator, 'is_capped', False),
+        'first_url': cl.get_query_string() if cl.cursor else None,
+        'next_url': cl.get_query_string({CURSOR_VAR: cl.next_cursor}) if cl.next_cursor else None,
+    }
+
+
+@register.tag(name='cursor_pagination')
+def cursor_pagination_tag(parser, token):
+    return InclusionAdminNode(
+        parser, token, func=cursor_pagination, template_name='cursor_pagination.html', takes_context=False,
+    )
@@ -0,0 +1,34 @@
+from decimal import Decimal
+
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import CustomUser
+
+PIN = '1234'
+
+
+def make_user(email, full_name='Test Trader', balance=None, currency=None):
+    """A user with a wallet (created by the post_save signal), optionally funded."""
+    user = CustomUser.objects.create_user(
+        email=email,
+        password='test-password-123',
+        full_name=full_name,
+        phone_number='0800000000',
+        country='Nigeria',
+        state_province='Lagos',
+        preferred_language='English',
+        business_type='business',
+        language='English',
+        pin=PIN,
+    )
+    wallet = user.wallet
+    if currency is not None:
+        wallet.currency = currency
+    if balance is not None:
+        wallet.balance = Decimal(balance)
+    wallet.save()
+    return user
+
+
+def auth_header(user):
+    return {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
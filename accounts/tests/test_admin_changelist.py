@@ -0,0 +1,51 @@
+import os
+import random
+import unittest
+
+from django.test import Client, TestCase, override_settings
+
+from accounts.management.commands import bench_admin
+
+# Seeding a realistic table takes minutes, so this only runs on request:
+#   ADMIN_BENCH_ROWS=1000000 python manage.py test accounts.tests.test_admin_changelist
+ROWS = int(os.environ.get('ADMIN_BENCH_ROWS', '0'))
+MAX_MS = float(os.environ.get('ADMIN_BENCH_MAX_MS', '250'))
+
+# (queries, ms) per request. The query budget covers session, user, row
+# estimate or capped count, page, date hierarchy and search lookups; none of
+# them grows with the table.
+LIMITS = {
+    'first page': (7, MAX_MS),
+    'deep page': (7, MAX_MS),
+    'search email': (8, MAX_MS),
+    'search account': (7, MAX_MS),
+    # SQLite's case-insensitive LIKE can't use the receiver_name index, so
+    # the prefix search still scans there; MySQL seeks the index.
+    'search name prefix': (7, MAX_MS * 20),
+    'search transaction id': (6, MAX_MS),
+    'drill-down year': (7, MAX_MS),
+    'drill-down month': (7, MAX_MS),
+}
+
+
+@unittest.skipUnless(ROWS, 'Set ADMIN_BENCH_ROWS to run the admin changelist benchmark.')
+@override_settings(ROOT_URLCONF=bench_admin.__name__)
+class TransactionChangelistPerformanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = bench_admin.seed(ROWS, users=1000, months=24, rng=random.Random(0))
+        cls.admin_user = bench_admin.create_admin_user()
+
+    def test_every_scenario_is_bounded(self):
+        client = Client()
+        client.force_login(self.admin_user)
+        scenarios = bench_admin.scenarios(self.data, ROWS)
+        self.assertEqual({label for label, _, _ in scenarios}, set(LIMITS))
+        for label, stock_params, fast_params in scenarios:
+            params = stock_params if fast_params is None else fast_params
+            max_queries, max_ms = LIMITS[label]
+            with self.subTest(label):
+                elapsed, queries, status = bench_admin.measure(client, '/admin/accounts/transaction/', params, 3)
+                self.assertEqual(status, 200)
+                self.assertLessEqual(queries, max_queries)
+                self.assertLess(elapsed, max_ms)
@@ -0,0 +1,29 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from accounts import compression
+from accounts.models import ChatMessage, ChatSession
+
+from . import make_user
+
+
+class CompressedTextFieldTests(TestCase):
+    def setUp(self):
+        self.session = ChatSession.objects.create(user=make_user('chat@example.com'))
+
+    def test_round_trip(self):
+        text = 'What documents do I need to export cashew nuts to Kenya? ' * 20
+        for codec in ('zlib', 'raw'):
+            with self.subTest(codec=codec), override_settings(CHAT_COMPRESSION_MIN_SIZE=1 if codec == 'zlib' else 10 ** 6):
+                message = ChatMessage.objects.create(chat_session=self.session, role='user', content=text)
+                stored = ChatMessage.objects.values_list('content', flat=True).get(pk=message.pk)
+                self.assertIsInstance(stored, bytes)
+                self.assertTrue(stored.startswith(compression.MARKER))
+                self.assertEqual(ChatMessage.objects.get(pk=message.pk).content, text)
+
+    def test_legacy_text_rows_stay_readable(self):
+        message = ChatMessage.objects.create(chat_session=self.session, role='user', content='placeholder')
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE accounts_chatmessage SET content = %s WHERE id = %s', ['Legacy plain text', message.pk])
+        self.assertEqual(ChatMessage.objects.get(pk=message.pk).content, 'Legacy plain text')
+        self.assertEqual(ChatMessage.objects.values_list('content', flat=True).get(pk=message.pk), 'Legacy plain text')
@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import ChatMessage, ChatSession
+from backend.db_router import pin_to_primary
+
+from . import auth_header, make_user
+
+
+class ChatSessionHistoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('trader@example.com')
+        # Keep the history view on the primary, which holds this test's rows.
+        pin_to_primary(self.user)
+        self.session = ChatSession.objects.create(user=self.user)
+        old = timezone.now() - timedelta(days=120)
+        ChatMessage.objects.create(chat_session=self.session, role='user', content='Old question', timestamp=old)
+        ChatMessage.objects.create(chat_session=self.session, role='user', content='New question')
+
+    def get(self, **params):
+        return self.client.get(reverse('chatbot-sessions'), params, **auth_header(self.user))
+
+    def test_unbounded_history_has_every_message(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['content'] for m in response.data[0]['messages']], ['Old question', 'New question'])
+
+    def test_messages_are_bounded_like_their_sessions(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(months=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['content'] for m in response.data[0]['messages']], ['New question'])
+        message_query = next(q['sql'] for q in queries.captured_queries if 'FROM "accounts_chatmessage"' in q['sql'])
+        self.assertIn('"accounts_chatmessage"."timestamp" >=', message_query)
+
+    def test_month_selects_one_month(self):
+        month = (timezone.localtime() - timedelta(days=120)).strftime('%Y-%m')
+        self.assertEqual(self.get(month=month).data, [])
@@ -0,0 +1,107 @@
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts import partitioning
+from accounts.models import ReconciliationRun, SearchDocument, Transaction, Wallet
+from backend.db_router import pin_to_primary
+
+from . import auth_header, make_user
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        archive_root = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_root.cleanup)
+        archive_settings = override_settings(ARCHIVE_ROOT=archive_root.name)
+        archive_settings.enable()
+        self.addCleanup(archive_settings.disable)
+
+        self.alice = make_user('alice@example.com', full_name='Alice')
+        self.bob = make_user('bob@example.com', full_name='Bob')
+        for user in (self.alice, self.bob):
+            # Keep the history view on the primary, which holds this test's rows.
+            pin_to_primary(user)
+
+        self.month = partitioning.add_months(partitioning.live_cutoff(), -2)
+        old = self.month + timedelta(days=3)
+        self.record(self.alice, self.alice, Decimal('200.00'), old, kind='deposit')
+        self.archived = self.record(self.alice, self.bob, Decimal('50.00'), old + timedelta(hours=1))
+        self.live = self.record(self.bob, self.alice, Decimal('20.00'), timezone.now() - timedelta(days=1))
+
+    def record(self, sender, receiver, amount, timestamp, kind='transfer'):
+        if kind == 'transfer':
+            Wallet.objects.filter(user=sender).update(balance=F('balance') - amount)
+        Wallet.objects.filter(user=receiver).update(balance=F('balance') + amount)
+        return Transaction.objects.create(
+            kind=kind, sender=sender, receiver=receiver, amount=amount, received_amount=amount,
+            receiver_name=receiver.full_name, receiver_account_number=receiver.wallet.wallet_number,
+            timestamp=timestamp,
+        )
+
+    def archive(self, times=1):
+        for _ in range(times):
+            partitioning.archive_month(Transaction, self.month)
+        partitioning.drop_month(Transaction, self.month)
+
+    def history(self, user, **params):
+        response = self.client.get(reverse('wallet-transactions'), params, **auth_header(user))
+        self.assertEqual(response.status_code, 200)
+        return [(item['transaction_id'], item['transaction_direction']) for item in response.data]
+
+    def test_archived_month_leaves_the_live_tables(self):
+        self.archive()
+        start, end = partitioning.month_range(self.month)
+        self.assertFalse(Transaction.objects.filter(timestamp__gte=start, timestamp__lt=end).exists())
+        self.assertFalse(
+            SearchDocument.objects.filter(kind='transaction', timestamp__gte=start, timestamp__lt=end).exists()
+        )
+        self.assertTrue(SearchDocument.objects.filter(kind='transaction', object_id=self.live.pk).exists())
+        self.assertEqual(partitioning.archived_months(Transaction), [self.month])
+
+    def test_month_merges_archived_rows(self):
+        self.archive()
+        month = partitioning.month_label(self.month)
+        archived_id = str(self.archived.transaction_id)
+        self.assertEqual(self.history(self.bob, month=month), [(archived_id, 'incoming')])
+        self.assertEqual(
+            [direction for _, direction in self.history(self.alice, month=month)], ['outgoing', 'deposit'],
+        )
+
+    def test_months_and_unbounded_history_reach_the_archive(self):
+        self.archive()
+        live_id, archived_id = str(self.live.transaction_id), str(self.archived.transaction_id)
+        expected = [(live_id, 'outgoing'), (archived_id, 'incoming')]
+        self.assertEqual(self.history(self.bob), expected)
+        self.assertEqual(self.history(self.bob, months=24), expected)
+        self.assertEqual(self.history(self.bob, months=2), [(live_id, 'outgoing')])
+
+    def test_type_applies_to_archived_rows(self):
+        self.archive()
+        live_id, archived_id = str(self.live.transaction_id), str(self.archived.transaction_id)
+        self.assertEqual(self.history(self.bob, type='incoming'), [(archived_id, 'incoming')])
+        self.assertEqual(self.history(self.bob, type='outgoing'), [(live_id, 'outgoing')])
+
+    def test_rearchived_month_is_listed_once(self):
+        self.archive(times=2)
+        month = partitioning.month_label(self.month)
+        self.assertEqual(len(self.history(self.alice, month=month)), 2)
+
+    def test_month_archived_but_not_dropped_is_listed_once(self):
+        partitioning.archive_month(Transaction, self.month)
+        self.assertEqual(len(self.history(self.alice)), 3)
+
+    def test_full_reconcile_balances_after_archival(self):
+        self.archive()
+        call_command('reconcile_balances', '--workers', '1', stdout=StringIO())
+        run = ReconciliationRun.objects.order_by('-id').first()
+        self.assertEqual(run.mismatches, [])
@@ -0,0 +1,49 @@
+import hashlib
+from unittest import mock
+
+from django.test import TestCase
+
+from accounts.models import PromptTemplate, PromptTemplateManager
+
+
+class PromptTemplateTests(TestCase):
+    def setUp(self):
+        PromptTemplateManager._cache.clear()
+        self.addCleanup(PromptTemplateManager._cache.clear)
+
+    def test_new_content_gets_the_next_version(self):
+        first = PromptTemplate.objects.get_for_content('system', 'You are a trade assistant.')
+        again = PromptTemplate.objects.get_for_content('system', 'You are a trade assistant.')
+        second = PromptTemplate.objects.get_for_content('system', 'You are an export assistant.')
+        self.assertEqual(first.pk, again.pk)
+        self.assertEqual((first.version, second.version), (1, 2))
+
+    def test_another_worker_storing_the_same_content_first(self):
+        content = 'You are a trade assistant.'
+        original = PromptTemplateManager.get_or_create
+
+        def racing_get_or_create(manager, **kwargs):
+            PromptTemplate.objects.create(
+                name='system', version=1, content=content,
+                checksum=hashlib.sha256(content.encode('utf-8')).hexdigest(),
+            )
+            return original(manager, **kwargs)
+
+        with mock.patch.object(PromptTemplateManager, 'get_or_create', racing_get_or_create):
+            template = PromptTemplate.objects.get_for_content('system', content)
+        self.assertEqual(PromptTemplate.objects.get().pk, template.pk)
+
+    def test_another_worker_taking_the_version_first(self):
+        original = PromptTemplateManager.get_or_create
+        calls = []
+
+        def racing_get_or_create(manager, **kwargs):
+            if not calls:
+                PromptTemplate.objects.create(name='system', version=1, content='Other', checksum='0' * 64)
+            calls.append(kwargs)
+            return original(manager, **kwargs)
+
+        with mock.patch.object(PromptTemplateManager, 'get_or_create', racing_get_or_create):
+            template = PromptTemplate.objects.get_for_content('system', 'You are a trade assistant.')
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(template.version, 2)
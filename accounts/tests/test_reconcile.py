@@ -0,0 +1,79 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import LedgerBalance, ReconciliationRun, Transaction, Wallet
+
+from . import PIN, auth_header, make_user
+
+
+class ReconcileBalancesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = make_user('alice@example.com', full_name='Alice')
+        self.bob = make_user('bob@example.com', full_name='Bob')
+        for user in (self.alice, self.bob):
+            self.post(user, 'wallet-deposit', amount='200.00')
+
+    def post(self, user, name, **data):
+        response = self.client.post(reverse(name), data, content_type='application/json', **auth_header(user))
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def transfer(self, sender, recipient, amount, **extra):
+        return self.post(
+            sender, 'wallet-transfer', step='transfer', pin=PIN,
+            recipient_wallet_number=recipient.wallet.wallet_number, amount=amount, **extra,
+        )
+
+    def reconcile(self, *args):
+        call_command('reconcile_balances', '--workers', '1', *args, stdout=StringIO())
+        return ReconciliationRun.objects.order_by('-id').first()
+
+    def test_ledger_matches_balances_after_transfers(self):
+        self.transfer(self.alice, self.bob, '50.00')
+        self.transfer(self.bob, self.alice, '20.00')
+        self.post(self.alice, 'wallet-deposit', amount='5.00', currency='USD')
+        self.transfer(self.alice, self.alice, '5.00', currency='USD')
+        run = self.reconcile()
+        self.assertEqual(run.mismatches, [])
+        self.assertEqual(run.balances_checked, 3)
+
+    def test_untracked_balance_change_is_reported(self):
+        self.reconcile()
+        Wallet.objects.filter(user=self.bob).update(balance=Decimal('999.00'))
+        self.transfer(self.alice, self.bob, '1.00')
+        run = self.reconcile('--incremental')
+        self.assertEqual(len(run.mismatches), 1)
+        self.assertEqual(run.mismatches[0]['user_id'], self.bob.pk)
+
+    def deposit(self, user, amount, **fields):
+        Wallet.objects.filter(user=user).update(balance=F('balance') + amount)
+        return Transaction.objects.create(
+            kind='deposit', sender=user, receiver=user, amount=amount, received_amount=amount,
+            receiver_name=user.full_name, receiver_account_number=user.wallet.wallet_number, **fields,
+        )
+
+    def test_transfer_committed_after_a_higher_id_is_not_skipped(self):
+        now = timezone.now()
+        self.deposit(self.alice, Decimal('10.00'), pk=1000, timestamp=now)
+        self.reconcile()
+        # Allocated a lower id before the run, committed after it.
+        self.deposit(self.alice, Decimal('5.00'), pk=900, timestamp=now - timedelta(seconds=5))
+        later = now + timedelta(seconds=2 * settings.RECONCILE_SETTLE_SECONDS)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            run = self.reconcile('--incremental')
+        self.assertEqual(run.mismatches, [])
+        self.assertEqual(run.last_transaction_id, 1000)
+        self.assertEqual(
+            LedgerBalance.objects.get(user=self.alice).amount, Wallet.objects.get(user=self.alice).balance,
+        )
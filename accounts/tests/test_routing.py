@@ -0,0 +1,96 @@
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts import search
+from accounts.models import Transaction, Wallet
+from backend import db_router
+
+from . import PIN, auth_header, make_user
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    # Not TestCase: the replica connection can't read rows the primary's
+    # test transaction hasn't committed.
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        # Detected once per process, on the primary.
+        search.backend()
+        self.sender = make_user('sender@example.com', balance='500.00')
+        self.recipient = make_user('recipient@example.com', full_name='Recipient')
+
+    def capture(self, method, url, **kwargs):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = getattr(self.client, method)(url, **kwargs)
+        return response, len(primary), len(replica)
+
+    def transfer(self):
+        return self.client.post(reverse('wallet-transfer'), {
+            'step': 'transfer',
+            'recipient_wallet_number': self.recipient.wallet.wallet_number,
+            'amount': '10.00',
+            'pin': PIN,
+        }, content_type='application/json', **auth_header(self.sender))
+
+    def test_listed_views_read_from_the_replica(self):
+        for name in ('wallet-transactions', 'chatbot-sessions', 'wallet-info', 'user-info', 'search'):
+            with self.subTest(name):
+                response, primary, replica = self.capture('get', reverse(name), data={'q': 'cocoa'}, **auth_header(self.sender))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(primary, 0)
+                self.assertGreater(replica, 0)
+
+    def test_search_reads_index_and_documents_from_the_replica(self):
+        Transaction.objects.create(
+            sender=self.sender, receiver=self.recipient, amount='25.00', description='Cocoa shipment deposit',
+            receiver_name='Recipient', receiver_account_number=self.recipient.wallet.wallet_number,
+        )
+        response, primary, replica = self.capture(
+            'get', reverse('search'), data={'q': 'cocoa shipment'}, **auth_header(self.sender),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(primary, 0)
+        self.assertEqual([result['kind'] for result in response.data['results']], ['transaction'])
+
+    def test_unlisted_views_read_from_the_primary(self):
+        response, primary, replica = self.capture(
+            'post', reverse('wallet-verify-batch'),
+            data={'wallet_numbers': [self.recipient.wallet.wallet_number]},
+            content_type='application/json', **auth_header(self.sender),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(replica, 0)
+
+    def test_writes_go_to_the_primary(self):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.transfer()
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(len(replica), 0)
+        self.assertEqual(db_router.PrimaryReplicaRouter().db_for_write(Wallet), 'default')
+
+    def test_transfer_pins_both_parties_to_the_primary(self):
+        self.assertEqual(self.transfer().status_code, 200)
+        self.assertTrue(db_router.is_pinned_to_primary(self.sender.pk))
+        self.assertTrue(db_router.is_pinned_to_primary(self.recipient.pk))
+
+        response, primary, replica = self.capture('get', reverse('wallet-transactions'), **auth_header(self.sender))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(replica, 0)
+        self.assertGreater(primary, 0)
+
+    def test_pinning_can_be_disabled(self):
+        with self.settings(READ_YOUR_WRITES_SECONDS=0):
+            self.assertEqual(self.transfer().status_code, 200)
+        self.assertFalse(db_router.is_pinned_to_primary(self.sender.pk))
+
+    def test_missing_or_bad_token_stays_on_the_primary(self):
+        for headers in ({}, {'HTTP_AUTHORIZATION': 'Bearer not-a-token'}, {'HTTP_AUTHORIZATION': 'Basic abc'}):
+            with self.subTest(headers=headers):
+                response, primary, replica = self.capture('get', reverse('wallet-transactions'), **headers)
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(replica, 0)
@@ -0,0 +1,89 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts import search
+from accounts.models import ChatMessage, ChatSession, SearchDocument, SearchPosting, Transaction
+
+from . import make_user
+
+
+class SearchTests(TestCase):
+    backend = 'fts5'
+
+    def setUp(self):
+        search._backend = self.backend
+        self.addCleanup(setattr, search, '_backend', None)
+        self.user = make_user('trader@example.com')
+        self.other = make_user('other@example.com', full_name='Cocoa Buyer')
+        self.session = ChatSession.objects.create(user=self.user)
+
+    def message(self, content, **fields):
+        return ChatMessage.objects.create(chat_session=self.session, role='assistant', content=content, **fields)
+
+    def test_finds_messages_with_every_word(self):
+        self.message('You will need a phytosanitary certificate for Kenya.')
+        self.message('Kenya charges no duty on cocoa.')
+        results, has_next = search.search(self.user, 'certificate kenya')
+        self.assertFalse(has_next)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(
+            results[0]['snippet'],
+            'You will need a phytosanitary <mark>certificate</mark> for <mark>Kenya</mark>.',
+        )
+        self.assertEqual(results[0]['id'], self.session.session_id)
+
+    def test_message_text_is_not_stored_twice(self):
+        self.message('Shea butter exports to Ghana.')
+        self.assertEqual(SearchDocument.objects.get(kind='message').body, '')
+
+    def test_transactions_are_searchable_by_both_parties(self):
+        Transaction.objects.create(
+            sender=self.user, receiver=self.other, amount=Decimal('10.00'), description='Cocoa deposit',
+            receiver_name=self.other.full_name, receiver_account_number=self.other.wallet.wallet_number,
+        )
+        for user in (self.user, self.other):
+            with self.subTest(user=user.email):
+                results, _ = search.search(user, 'cocoa', kind='transaction')
+                self.assertEqual(len(results), 1)
+        self.assertEqual(search.search(self.user, 'cocoa', kind='message')[0], [])
+
+    def test_users_only_see_their_own_documents(self):
+        self.message('Sesame shipment from Lagos.')
+        self.assertEqual(search.search(self.other, 'sesame')[0], [])
+
+    def test_forgetting_a_month_removes_it_from_the_index(self):
+        old = timezone.now() - timedelta(days=400)
+        self.message('Ginger sample for the buyer.', timestamp=old)
+        self.message('Ginger invoice paid.')
+        search.forget_range(ChatMessage, old - timedelta(days=1), old + timedelta(days=1))
+        results, _ = search.search(self.user, 'ginger')
+        self.assertEqual([result['snippet'] for result in results], ['<mark>Ginger</mark> invoice paid.'])
+        if self.backend == 'fts5':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT COUNT(*) FROM {search.FTS_TABLE} WHERE {search.FTS_TABLE} MATCH %s',
+                    [f'"{self.user.pk}_ginger"'],
+                )
+                self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_pages(self):
+        for index in range(5):
+            self.message(f'Freight quote number {index}.')
+        first, has_next = search.search(self.user, 'freight quote', page_size=3)
+        second, last = search.search(self.user, 'freight quote', page=2, page_size=3)
+        self.assertEqual((len(first), has_next, len(second), last), (3, True, 2, False))
+
+
+class PythonSearchTests(SearchTests):
+    backend = 'python'
+
+    def test_postings_are_built_from_the_message(self):
+        self.message('Cashew cashew nuts.')
+        self.assertEqual(
+            dict(SearchPosting.objects.filter(user=self.user).values_list('term', 'frequency')),
+            {'cashew': 2, 'nuts': 1},
+        )
@@ -0,0 +1,114 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import Transaction, Wallet, WalletBalance
+
+from . import PIN, auth_header, make_user
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = make_user('alice@example.com', full_name='Alice', balance='500.00')
+        self.bob = make_user('bob@example.com', full_name='Bob', balance='300.00')
+
+    def deposit(self, user, amount, **extra):
+        return self.client.post(
+            reverse('wallet-deposit'), {'amount': amount, **extra},
+            content_type='application/json', **auth_header(user),
+        )
+
+    def transfer(self, sender, recipient, amount, **extra):
+        return self.client.post(reverse('wallet-transfer'), {
+            'step': 'transfer',
+            'recipient_wallet_number': recipient.wallet.wallet_number,
+            'amount': amount,
+            'pin': PIN,
+            **extra,
+        }, content_type='application/json', **auth_header(sender))
+
+    def balance(self, user):
+        return Wallet.objects.get(user=user).balance
+
+    def test_transfer_moves_money_both_ways(self):
+        self.assertEqual(self.transfer(self.alice, self.bob, '120.00').status_code, 200)
+        self.assertEqual(self.transfer(self.bob, self.alice, '20.00').status_code, 200)
+        self.assertEqual(self.balance(self.alice), Decimal('400.00'))
+        self.assertEqual(self.balance(self.bob), Decimal('400.00'))
+        self.assertEqual(Transaction.objects.count(), 2)
+
+    def test_wallets_are_locked_in_one_query_in_primary_key_order(self):
+        for sender, recipient in ((self.alice, self.bob), (self.bob, self.alice)):
+            with self.subTest(sender=sender.email), CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.transfer(sender, recipient, '1.00').status_code, 200)
+            locks = [
+                query['sql'] for query in queries.captured_queries
+                if query['sql'].startswith('SELECT "accounts_wallet"') and 'ORDER BY' in query['sql']
+            ]
+            self.assertEqual(len(locks), 1, locks)
+            self.assertIn('ORDER BY "accounts_wallet"."id" ASC', locks[0])
+
+    def test_insufficient_balance_is_rejected(self):
+        response = self.transfer(self.alice, self.bob, '500.01')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.balance(self.alice), Decimal('500.00'))
+
+    def test_unknown_recipient(self):
+        response = self.client.post(reverse('wallet-transfer'), {
+            'step': 'transfer', 'recipient_wallet_number': '000000', 'amount': '1.00', 'pin': PIN,
+        }, content_type='application/json', **auth_header(self.alice))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.balance(self.alice), Decimal('500.00'))
+
+    def test_wrong_pin_is_rejected(self):
+        response = self.transfer(self.alice, self.bob, '1.00', pin='9999')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_self_transfer_in_the_wallet_currency_is_rejected(self):
+        response = self.transfer(self.alice, self.alice, '50.00')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.balance(self.alice), Decimal('500.00'))
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_self_transfer_converts_a_sub_balance(self):
+        self.assertEqual(self.deposit(self.alice, '10.00', currency='USD').status_code, 200)
+        response = self.transfer(self.alice, self.alice, '10.00', currency='USD')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(WalletBalance.objects.get(wallet=self.alice.wallet, currency='USD').balance, Decimal('0.00'))
+        self.assertEqual(self.balance(self.alice), Decimal('500.00') + response.data['received_amount'])
+
+    def test_non_positive_amounts_are_rejected(self):
+        for amount in ('0.00', '-50.00'):
+            with self.subTest(amount=amount):
+                self.assertEqual(self.deposit(self.alice, amount).status_code, 400)
+                self.assertEqual(self.transfer(self.alice, self.bob, amount).status_code, 400)
+        self.assertEqual(self.balance(self.alice), Decimal('500.00'))
+        self.assertEqual(self.balance(self.bob), Decimal('300.00'))
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_deposit_is_recorded_in_the_ledger(self):
+        self.assertEqual(self.deposit(self.alice, '25.50').status_code, 200)
+        self.assertEqual(self.balance(self.alice), Decimal('525.50'))
+        deposit = Transaction.objects.get()
+        self.assertEqual((deposit.kind, deposit.amount), ('deposit', Decimal('25.50')))
+
+    def test_conversion_that_rounds_to_nothing_is_rejected(self):
+        dollars = make_user('usd@example.com', full_name='Dollar Wallet', currency='USD')
+        response = self.transfer(self.alice, dollars, '0.01')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.balance(self.alice), Decimal('500.00'))
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_cross_currency_transfer_credits_the_converted_amount(self):
+        dollars = make_user('usd@example.com', full_name='Dollar Wallet', currency='USD')
+        response = self.transfer(self.alice, dollars, '153.00')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data['received_amount'], Decimal('0.10'))
+        self.assertEqual(self.balance(dollars), Decimal('0.10'))
+        self.assertEqual(self.balance(self.alice), Decimal('347.00'))
@@ -0,0 +1,110 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from accounts.models import Transaction
+from accounts.velocity import RingCounter, VelocityEngine
+
+from . import make_user
+
+WINDOW = 3600
+BUCKETS = 12
+
+
+class RingCounterTests(SimpleTestCase):
+    def setUp(self):
+        self.counter = RingCounter(WINDOW, BUCKETS)
+        self.now = 1_800_000_000.0
+
+    def test_counts_events_in_the_window(self):
+        for offset in (0, 600, 1800, 3000):
+            self.counter.add(self.now - offset, 10.0)
+        self.assertEqual(self.counter.totals(self.now), (4, 40.0))
+        self.assertEqual(self.counter.totals(self.now + WINDOW), (0, 0.0))
+
+    def test_stale_event_does_not_reset_newer_slot(self):
+        for _ in range(5):
+            self.counter.add(self.now, 10.0)
+        self.counter.add(self.now - WINDOW, 99.0)
+        self.assertEqual(self.counter.totals(self.now), (5, 50.0))
+
+    def test_event_older_than_the_window_is_not_counted(self):
+        self.counter.add(self.now, 10.0)
+        self.counter.add(self.now - 2 * WINDOW + 100, 99.0)
+        self.assertEqual(self.counter.totals(self.now), (1, 10.0))
+
+
+class KnownRecipientTests(SimpleTestCase):
+    def setUp(self):
+        rules = {rule: float('inf') for rule in settings.VELOCITY_RULES}
+        rules['max_new_recipients_per_window'] = 0
+        self.engine = VelocityEngine(rules=rules, window=WINDOW, buckets=BUCKETS)
+        self.now = 1_800_000_000.0
+        self.stale = self.now - (settings.VELOCITY_KNOWN_RECIPIENT_DAYS + 1) * 86400
+
+    def test_stale_pair_counts_as_new(self):
+        self.engine.record(1, '000001', 10, now=self.stale)
+        self.engine.record(1, '000002', 10, now=self.now - 60)
+        self.assertEqual(self.engine.check(1, '000001', 10, now=self.now), ['max_new_recipients_per_window'])
+        self.assertEqual(self.engine.check(1, '000002', 10, now=self.now), [])
+
+    def test_prune_drops_stale_pairs(self):
+        self.engine.record(1, '000001', 10, now=self.stale)
+        self.engine.record(1, '000002', 10, now=self.now)
+        self.engine.record(2, '000001', 10, now=self.stale)
+        self.engine.prune(self.now)
+        self.assertEqual(self.engine.known_recipients, {1: {'000002': self.now}})
+
+
+class VelocitySyncTests(TestCase):
+    def setUp(self):
+        self.sender = make_user('sender@example.com')
+        self.recipient = make_user('recipient@example.com', full_name='Recipient')
+        self.engine = VelocityEngine()
+        self.engine.warm()
+
+    def create_transfer(self, timestamp, **fields):
+        return Transaction.objects.create(
+            **fields, sender=self.sender, receiver=self.recipient, amount=Decimal('10.00'), currency='NGN',
+            receiver_name='Recipient', receiver_account_number=self.recipient.wallet.wallet_number,
+            timestamp=timestamp,
+        )
+
+    def sender_count(self):
+        return self.engine.senders[self.sender.pk].totals(timezone.now().timestamp())[0]
+
+    def test_sync_picks_up_transfers_committed_late(self):
+        started = timezone.now()
+        self.create_transfer(started, pk=100)
+        self.engine.sync()
+        # Allocated a lower id and timestamped before the last sync, but
+        # committed after it.
+        self.create_transfer(started - timedelta(seconds=5), pk=50)
+        self.engine.sync()
+        self.assertEqual(self.sender_count(), 2)
+
+    def test_resync_does_not_double_count(self):
+        self.create_transfer(timezone.now())
+        self.engine.sync()
+        self.engine.sync()
+        self.assertEqual(self.sender_count(), 1)
+
+    def test_locally_recorded_transfer_is_not_counted_again(self):
+        transfer = self.create_transfer(timezone.now())
+        self.engine.record(self.sender.pk, transfer.receiver_account_number, 10, transaction_id=transfer.pk)
+        self.engine.sync()
+        self.assertEqual(self.sender_count(), 1)
+
+    def test_warm_keeps_the_latest_transfer_per_pair(self):
+        latest = timezone.now() - timedelta(days=2)
+        self.create_transfer(latest - timedelta(days=5))
+        self.create_transfer(latest)
+        engine = VelocityEngine()
+        engine.warm()
+        self.assertEqual(
+            engine.known_recipients[self.sender.pk],
+            {self.recipient.wallet.wallet_number: latest.timestamp()},
+        )
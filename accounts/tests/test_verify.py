@@ -0,0 +1,50 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.throttling import ScopedRateThrottle
+
+from . import auth_header, make_user
+
+
+class BatchVerifyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('payer@example.com')
+        self.payee = make_user('payee@example.com', full_name='Payee')
+
+    def verify(self, user, wallet_numbers):
+        return self.client.post(
+            reverse('wallet-verify-batch'), {'wallet_numbers': wallet_numbers},
+            content_type='application/json', **auth_header(user),
+        )
+
+    def test_resolves_known_and_unknown_numbers(self):
+        number = self.payee.wallet.wallet_number
+        unknown = '000000' if number != '000000' else '000001'
+        response = self.verify(self.user, [number, unknown])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [
+            {'wallet_number': number, 'found': True, 'recipient_name': 'Payee'},
+            {'wallet_number': unknown, 'found': False, 'recipient_name': None},
+        ])
+
+    def test_is_throttled_per_user(self):
+        limit = int(ScopedRateThrottle.THROTTLE_RATES['wallet_verify'].split('/')[0])
+        numbers = [self.payee.wallet.wallet_number]
+        for _ in range(limit):
+            self.assertEqual(self.verify(self.user, numbers).status_code, 200)
+        self.assertEqual(self.verify(self.user, numbers).status_code, 429)
+        # Other users have their own allowance.
+        self.assertEqual(self.verify(self.payee, numbers).status_code, 200)
+
+    def test_single_verify_shares_the_allowance(self):
+        limit = int(ScopedRateThrottle.THROTTLE_RATES['wallet_verify'].split('/')[0])
+        numbers = [self.payee.wallet.wallet_number]
+        for _ in range(limit - 1):
+            self.assertEqual(self.verify(self.user, numbers).status_code, 200)
+        response = self.client.post(
+            reverse('wallet-transfer'), {'recipient_wallet_number': numbers[0], 'amount': '1.00', 'step': 'verify'},
+            content_type='application/json', **auth_header(self.user),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.verify(self.user, numbers).status_code, 429)
@@ -1,17 +1,21 @@
 from django.urls import path
-from .views import RegistrationView, LoginView, UserInfoView, WalletInfoView, DepositView, TransferView, TransactionListView, TransactionDetailView, ChatBotView, ChatSessionListView
+from .startup import LazyView
 
+# Views are imported on first use so that booting a worker doesn't pay for
+# DRF serializers, the HTTP client and the rest of accounts.views up front.
 urlpatterns = [
-    path('register/', RegistrationView.as_view(), name='register'),
-    path('login/', LoginView.as_view(), name='login'),
-    path('user-info/', UserInfoView.as_view(), name='user-info'),
-    path('wallet/', WalletInfoView.as_view(), name='wallet-info'),
-    path('wallet/deposit/', DepositView.as_view(), name='wallet-deposit'),
-    path('wallet/transfer/', TransferView.as_view(), name='wallet-transfer'),
-    path('wallet/transactions/', TransactionListView.as_view(), name='wallet-transactions'),
-    path('wallet/transactions/<uuid:transaction_id>/', TransactionDetailView.as_view(), name='wallet-transaction-detail'),
-    path('chatbot/', ChatBotView.as_view(), name='chatbot'),
-    path('chatbot/sessions/', ChatSessionListView.as_view(), name='chatbot-sessions'),
+    path('register/', LazyView('accounts.views.RegistrationView'), name='register'),
+    path('login/', LazyView('accounts.views.LoginView'), name='login'),
+    path('user-info/', LazyView('accounts.views.UserInfoView'), name='user-info'),
+    path('wallet/', LazyView('accounts.views.WalletInfoView'), name='wallet-info'),
+    path('wallet/deposit/', LazyView('accounts.views.DepositView'), name='wallet-deposit'),
+    path('wallet/transfer/', LazyView('accounts.views.TransferView'), name='wallet-transfer'),
+    path('wallet/verify/', LazyView('accounts.views.BatchVerifyView'), name='wallet-verify-batch'),
+    path('wallet/transactions/', LazyView('accounts.views.TransactionListView'), name='wallet-transactions'),
+    path('wallet/transactions/<uuid:transaction_id>/', LazyView('accounts.views.TransactionDetailView'), name='wallet-transaction-detail'),
+    path('chatbot/', LazyView('accounts.views.ChatBotView'), name='chatbot'),
+    path('chatbot/sessions/', LazyView('accounts.views.ChatSessionListView'), name='chatbot-sessions'),
+    path('search/', LazyView('accounts.views.SearchView'), name='search'),
 
 
 ]
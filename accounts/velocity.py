@@ -0,0 +1,216 @@
+"""
+In-memory velocity rules for transfers.
+
+Each worker keeps per-sender and per-recipient sliding-window counters in
+fixed-size ring buffers, so checking a transfer costs a few array reads and
+no SQL. Counters are warmed from recent ``Transaction`` rows at startup (or
+on first use) and re-synced from rows created by other workers every
+``VELOCITY_SYNC_SECONDS``. A sync re-reads rows timestamped up to
+``VELOCITY_SYNC_MARGIN_SECONDS`` before the previous one, so transfers that
+commit after a later one are still seen; transaction ids already counted
+are skipped.
+"""
+import threading
+import time
+from array import array
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from . import fx
+
+
+class RingCounter:
+    """Event count and amount over a sliding window, in ``buckets`` slots."""
+
+    __slots__ = ('width', 'epochs', 'counts', 'amounts')
+
+    def __init__(self, window, buckets):
+        self.width = window // buckets
+        self.epochs = array('q', [-1]) * buckets
+        self.counts = array('l', [0]) * buckets
+        self.amounts = array('d', [0.0]) * buckets
+
+    def add(self, now, amount=0.0):
+        epoch = int(now) // self.width
+        index = epoch % len(self.epochs)
+        if self.epochs[index] != epoch:
+            if self.epochs[index] > epoch:
+                # A replayed event from before the window this slot now
+                # covers: it no longer counts, and must not reset the slot.
+                return
+            self.epochs[index] = epoch
+            self.counts[index] = 0
+            self.amounts[index] = 0.0
+        self.counts[index] += 1
+        self.amounts[index] += amount
+
+    def active(self, now):
+        return max(self.epochs) > int(now) // self.width - len(self.epochs)
+
+    def totals(self, now):
+        oldest = int(now) // self.width - len(self.epochs)
+        count = 0
+        amount = 0.0
+        for index, epoch in enumerate(self.epochs):
+            if epoch > oldest:
+                count += self.counts[index]
+                amount += self.amounts[index]
+        return count, amount
+
+
+class VelocityEngine:
+    def __init__(self, rules=None, window=None, buckets=None):
+        self._rules = rules
+        self.window = window or settings.VELOCITY_WINDOW_SECONDS
+        self.buckets = buckets or settings.VELOCITY_BUCKETS
+        self.senders = {}
+        self.recipients = {}
+        self.new_recipients = {}
+        # Sender id -> {recipient wallet number: time of the latest transfer}.
+        self.known_recipients = {}
+        self.synced_until = None
+        self.last_synced_at = 0.0
+        # Transaction id -> event time, for ids that a sync may read again.
+        self.recorded = {}
+        self.warmed = False
+        self.last_pruned_at = time.time()
+        self._lock = threading.Lock()
+
+    @property
+    def rules(self):
+        return self._rules if self._rules is not None else settings.VELOCITY_RULES
+
+    def _counter(self, counters, key):
+        counter = counters.get(key)
+        if counter is None:
+            counter = counters[key] = RingCounter(self.window, self.buckets)
+        return counter
+
+    def _is_known(self, sender_id, recipient_wallet_number, now):
+        last_seen = self.known_recipients.get(sender_id, {}).get(recipient_wallet_number)
+        return last_seen is not None and now - last_seen < settings.VELOCITY_KNOWN_RECIPIENT_DAYS * 86400
+
+    def check(self, sender_id, recipient_wallet_number, amount, now=None):
+        """Return the names of the rules this transfer would break."""
+        now = now or time.time()
+        amount = float(amount)
+        violations = []
+        rules = self.rules
+
+        sender = self.senders.get(sender_id)
+        count, total = sender.totals(now) if sender else (0, 0.0)
+        if count + 1 > rules['max_transfers_per_window']:
+            violations.append('max_transfers_per_window')
+        if total + amount > rules['max_amount_per_window']:
+            violations.append('max_amount_per_window')
+
+        if not self._is_known(sender_id, recipient_wallet_number, now):
+            new = self.new_recipients.get(sender_id)
+            new_count = new.totals(now)[0] if new else 0
+            if new_count + 1 > rules['max_new_recipients_per_window']:
+                violations.append('max_new_recipients_per_window')
+
+        recipient = self.recipients.get(recipient_wallet_number)
+        incoming = recipient.totals(now)[0] if recipient else 0
+        if incoming + 1 > rules['max_incoming_per_recipient_per_window']:
+            violations.append('max_incoming_per_recipient_per_window')
+        return violations
+
+    def record(self, sender_id, recipient_wallet_number, amount, now=None, transaction_id=None):
+        now = now or time.time()
+        amount = float(amount)
+        with self._lock:
+            if transaction_id is not None:
+                if transaction_id in self.recorded:
+                    return
+                self.recorded[transaction_id] = now
+            self._counter(self.senders, sender_id).add(now, amount)
+            self._counter(self.recipients, recipient_wallet_number).add(now)
+            if not self._is_known(sender_id, recipient_wallet_number, now):
+                self._counter(self.new_recipients, sender_id).add(now)
+            known = self.known_recipients.setdefault(sender_id, {})
+            known[recipient_wallet_number] = max(known.get(recipient_wallet_number, now), now)
+
+    def warm(self):
+        """Load known recipient pairs and the current window from history."""
+        from .models import Transaction
+
+        now = timezone.now()
+        known_since = now - timedelta(days=settings.VELOCITY_KNOWN_RECIPIENT_DAYS)
+        window_start = now - timedelta(seconds=self.window)
+        pairs = (
+            Transaction.objects.filter(kind='transfer', timestamp__gte=known_since, timestamp__lt=window_start)
+            .values_list('sender_id', 'receiver_account_number')
+            .annotate(last_seen=Max('timestamp'))
+            .order_by()
+        )
+        with self._lock:
+            for sender_id, wallet_number, last_seen in pairs.iterator():
+                self.known_recipients.setdefault(sender_id, {})[wallet_number] = last_seen.timestamp()
+        self._replay(Transaction.objects.filter(timestamp__gte=window_start), now)
+        self.warmed = True
+
+    def sync(self):
+        """Fold in transfers recorded by other workers since the last sync."""
+        from .models import Transaction
+        started = timezone.now()
+        since = self.synced_until - timedelta(seconds=settings.VELOCITY_SYNC_MARGIN_SECONDS)
+        self._replay(Transaction.objects.filter(timestamp__gte=since), started)
+        now = time.time()
+        if now - self.last_pruned_at > self.window:
+            self.prune(now)
+
+    def prune(self, now):
+        """Drop counters with no events left in the window, and stale recipient pairs."""
+        known_since = now - settings.VELOCITY_KNOWN_RECIPIENT_DAYS * 86400
+        with self._lock:
+            for counters in (self.senders, self.recipients, self.new_recipients):
+                for key in [key for key, counter in counters.items() if not counter.active(now)]:
+                    del counters[key]
+            for sender_id, known in list(self.known_recipients.items()):
+                for wallet_number in [number for number, last_seen in known.items() if last_seen < known_since]:
+                    del known[wallet_number]
+                if not known:
+                    del self.known_recipients[sender_id]
+            self.last_pruned_at = now
+
+    def _replay(self, queryset, started):
+        """Record the transfers in ``queryset``, which was read at ``started``."""
+        rates = fx.get_table()
+        rows = queryset.filter(kind='transfer').order_by('id').values_list(
+            'id', 'sender_id', 'receiver_account_number', 'amount', 'currency', 'timestamp',
+        )
+        for pk, sender_id, wallet_number, amount, currency, timestamp in rows.iterator():
+            # Amount limits are expressed in DEFAULT_CURRENCY.
+            if currency in rates:
+                amount = rates.convert(amount, currency, settings.DEFAULT_CURRENCY)[0]
+            self.record(sender_id, wallet_number, amount, now=timestamp.timestamp(), transaction_id=pk)
+        self.synced_until = started
+        # Only ids inside the next sync's margin can be read again.
+        horizon = (started - timedelta(seconds=settings.VELOCITY_SYNC_MARGIN_SECONDS)).timestamp()
+        with self._lock:
+            self.recorded = {pk: at for pk, at in self.recorded.items() if at >= horizon}
+        self.last_synced_at = time.monotonic()
+
+    def ensure_fresh(self):
+        if not self.warmed:
+            self.warm()
+        elif time.monotonic() - self.last_synced_at > settings.VELOCITY_SYNC_SECONDS:
+            self.sync()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = VelocityEngine()
+    _engine.ensure_fresh()
+    return _engine
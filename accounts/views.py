@@ -1,15 +1,43 @@
-from rest_framework import generics, status
+from rest_framework import generics, serializers, status
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.throttling import ScopedRateThrottle
 from django.contrib.auth import authenticate
-from .serializers import RegistrationSerializer, LoginSerializer, UserInfoSerializer, WalletSerializer, DepositSerializer, TransferSerializer, TransactionSerializer, ChatPromptSerializer, ChatSessionSerializer, ChatMessageSerializer
+from .serializers import RegistrationSerializer, LoginSerializer, UserInfoSerializer, WalletSerializer, DepositSerializer, TransferSerializer, BatchVerifySerializer, TransactionSerializer, ChatPromptSerializer, ChatSessionSerializer, ChatMessageSerializer, SearchQuerySerializer
 from rest_framework.views import APIView
-from .models import Wallet, CustomUser, Transaction, ChatSession, ChatMessage
+from .models import Wallet, WalletBalance, CustomUser, Transaction, ChatSession, ChatMessage, PromptTemplate
 from django.db import transaction
+from django.db.transaction import on_commit
 from decimal import Decimal
-from django.db.models import Q
-import requests
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from django.conf import settings
+from backend.db_router import pin_to_primary
+from . import directory, fx, prompts, search
+from .velocity import get_engine as get_velocity_engine
+from .partitioning import add_months, archived_months, archived_transactions, live_cutoff, month_range, month_start, parse_month
+
+
+def history_bounds(request):
+    """
+    Time bounds for history reads: ``?month=YYYY-MM`` selects one month and
+    ``?months=N`` the last N months. Returns ``(None, None)`` when unbounded.
+    """
+    month = request.query_params.get('month')
+    months = request.query_params.get('months')
+    if month:
+        try:
+            return month_range(parse_month(month))
+        except ValueError:
+            raise ValidationError({'month': 'Use the YYYY-MM format.'})
+    if months:
+        if not months.isdigit() or int(months) < 1:
+            raise ValidationError({'months': 'Must be a positive whole number.'})
+        current = month_start(timezone.localtime())
+        return add_months(current, 1 - int(months)), None
+    return None, None
 
 class RegistrationView(generics.CreateAPIView):
     serializer_class = RegistrationSerializer
@@ -62,14 +90,42 @@ class DepositView(APIView):
         serializer.is_valid(raise_exception=True)
         amount = serializer.validated_data['amount']
         wallet = request.user.wallet
-        wallet.balance += amount
-        wallet.save()
-        return Response({'message': f'Deposited {amount} successfully.', 'balance': wallet.balance}, status=status.HTTP_200_OK)
+        currency = serializer.validated_data.get('currency', wallet.currency).upper()
+        if currency not in fx.get_table():
+            return Response({'error': 'Unsupported currency.'}, status=status.HTTP_400_BAD_REQUEST)
+        # The balance update and its ledger row commit together, so the
+        # reconciliation job can always account for every deposit.
+        with transaction.atomic():
+            if currency == wallet.currency:
+                wallet = Wallet.objects.select_for_update().get(pk=wallet.pk)
+                wallet.balance += amount
+                wallet.save()
+                balance = wallet.balance
+            else:
+                sub_balance, _ = WalletBalance.objects.select_for_update().get_or_create(wallet=wallet, currency=currency)
+                sub_balance.balance += amount
+                sub_balance.save()
+                balance = sub_balance.balance
+            Transaction.objects.create(
+                kind='deposit',
+                sender=request.user,
+                receiver=request.user,
+                amount=amount,
+                currency=currency,
+                received_amount=amount,
+                received_currency=currency,
+                receiver_name=request.user.full_name,
+                receiver_account_number=wallet.wallet_number,
+                description='Deposit',
+            )
+        pin_to_primary(request.user)
+        return Response({'message': f'Deposited {amount} {currency} successfully.', 'balance': balance, 'currency': currency}, status=status.HTTP_200_OK)
 
 class TransferView(APIView):
     permission_classes = [IsAuthenticated]
+    # Only the verify step is throttled; see post().
+    throttle_scope = 'wallet_verify'
 
-    @transaction.atomic
     def post(self, request):
         serializer = TransferSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -80,57 +136,157 @@ class TransferView(APIView):
         description = serializer.validated_data.get('description', '')
         pin = serializer.validated_data.get('pin', None)
 
-        sender_wallet = request.user.wallet
-
         if step == 'verify':
-            try:
-                recipient_wallet = Wallet.objects.get(wallet_number=recipient_wallet_number)
-                recipient_user = recipient_wallet.user
-                return Response({'recipient_name': recipient_user.full_name}, status=status.HTTP_200_OK)
-            except Wallet.DoesNotExist:
+            # Resolving a number to a name shares BatchVerifyView's allowance,
+            # so neither endpoint can be used to enumerate the directory.
+            throttle = ScopedRateThrottle()
+            if not throttle.allow_request(request, self):
+                self.throttled(request, throttle.wait())
+            # Served from the wallet directory cache, outside any DB transaction.
+            recipient = directory.lookup(recipient_wallet_number)
+            if recipient is None:
                 return Response({'error': 'Recipient wallet not found.'}, status=status.HTTP_404_NOT_FOUND)
+            return Response({'recipient_name': recipient[1]}, status=status.HTTP_200_OK)
 
         elif step == 'transfer':
-            if pin is None:
-                return Response({'error': 'PIN is required to complete the transfer.'}, status=status.HTTP_400_BAD_REQUEST)
+            currency = serializer.validated_data.get('currency')
+            return self.transfer(request, recipient_wallet_number, amount, description, pin, currency)
 
-            if pin != request.user.pin:
-                return Response({'error': 'Invalid PIN.'}, status=status.HTTP_403_FORBIDDEN)
+        else:
+            return Response({'error': 'Invalid step parameter.'}, status=status.HTTP_400_BAD_REQUEST)
 
-            if sender_wallet.balance < amount:
-                return Response({'error': 'Insufficient balance.'}, status=status.HTTP_400_BAD_REQUEST)
+    @transaction.atomic
+    def transfer(self, request, recipient_wallet_number, amount, description, pin, currency=None):
+        sender_wallet = request.user.wallet
+        # One snapshot prices the whole transfer, even if a refresh lands mid-request.
+        rates = fx.get_table()
+        currency = (currency or sender_wallet.currency).upper()
+        if currency not in rates:
+            return Response({'error': 'Unsupported currency.'}, status=status.HTTP_400_BAD_REQUEST)
 
-            try:
-                recipient_wallet = Wallet.objects.select_for_update().get(wallet_number=recipient_wallet_number)
-                recipient_user = recipient_wallet.user
-            except Wallet.DoesNotExist:
-                return Response({'error': 'Recipient wallet not found.'}, status=status.HTTP_404_NOT_FOUND)
+        if pin is None:
+            return Response({'error': 'PIN is required to complete the transfer.'}, status=status.HTTP_400_BAD_REQUEST)
 
-            sender_wallet.balance -= amount
-            recipient_wallet.balance += amount
-            sender_wallet.save()
-            recipient_wallet.save()
+        if pin != request.user.pin:
+            return Response({'error': 'Invalid PIN.'}, status=status.HTTP_403_FORBIDDEN)
 
-            transaction = Transaction.objects.create(
-                sender=request.user,
-                receiver=recipient_user,
-                amount=amount,
-                receiver_name=recipient_user.full_name,
-                receiver_account_number=recipient_wallet.wallet_number,
-                description=description,
-            )
+        # Paying yourself is only meaningful as a conversion out of a sub-balance.
+        if recipient_wallet_number == sender_wallet.wallet_number and currency == sender_wallet.currency:
+            return Response({'error': 'Cannot transfer to your own wallet.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if currency == sender_wallet.currency:
+            sender_balance = None
+            available = sender_wallet.balance
+        else:
+            sender_balance = WalletBalance.objects.filter(wallet=sender_wallet, currency=currency).first()
+            available = sender_balance.balance if sender_balance else Decimal('0')
+
+        if available < amount:
+            return Response({'error': 'Insufficient balance.'}, status=status.HTTP_400_BAD_REQUEST)
 
+        # Velocity rules run in memory before any row is locked.
+        velocity = get_velocity_engine()
+        base_amount = rates.convert(amount, currency, settings.DEFAULT_CURRENCY)[0]
+        violations = velocity.check(request.user.id, recipient_wallet_number, base_amount)
+        if violations:
             return Response({
-                'message': f'Transferred {amount} to {recipient_user.full_name} ({recipient_wallet_number}) successfully.',
-                'balance': sender_wallet.balance,
-                'recipient_name': recipient_user.full_name,
-                'transaction_id': transaction.transaction_id,
-                'amount': amount,
-                'timestamp': transaction.timestamp
-            }, status=status.HTTP_200_OK)
+                'error': 'Transfer blocked by velocity limits. Please try again later.',
+                'rules': violations,
+            }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+
+        # Lock both wallets in one query, in primary key order, so transfers
+        # running in opposite directions can't deadlock; then the sender's
+        # sub-balance. Re-check the balance: the check above was unlocked.
+        wallets = {
+            wallet.pk: wallet
+            for wallet in Wallet.objects.select_for_update().filter(
+                Q(pk=sender_wallet.pk) | Q(wallet_number=recipient_wallet_number)
+            ).order_by('pk')
+        }
+        sender_wallet = wallets[sender_wallet.pk]
+        recipient_wallet = next(
+            (wallet for wallet in wallets.values() if wallet.wallet_number == recipient_wallet_number), None
+        )
+        if recipient_wallet is None:
+            return Response({'error': 'Recipient wallet not found.'}, status=status.HTTP_404_NOT_FOUND)
+        recipient_user = recipient_wallet.user
+
+        if sender_balance is not None:
+            sender_balance = WalletBalance.objects.select_for_update().get(pk=sender_balance.pk)
+            available = sender_balance.balance
+        else:
+            available = sender_wallet.balance
+        if available < amount:
+            return Response({'error': 'Insufficient balance.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        received_amount, rate = rates.convert(amount, currency, recipient_wallet.currency)
+        converted = currency != recipient_wallet.currency
+        if received_amount <= 0:
+            return Response(
+                {'error': f'Amount is too small to convert to {recipient_wallet.currency}.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
+        if sender_balance is not None:
+            sender_balance.balance -= amount
+            sender_balance.save()
         else:
-            return Response({'error': 'Invalid step parameter.'}, status=status.HTTP_400_BAD_REQUEST)
+            sender_wallet.balance -= amount
+            sender_wallet.save()
+        recipient_wallet.balance += received_amount
+        recipient_wallet.save()
+
+        transaction = Transaction.objects.create(
+            sender=request.user,
+            receiver=recipient_user,
+            amount=amount,
+            currency=currency,
+            received_amount=received_amount,
+            received_currency=recipient_wallet.currency,
+            fx_rate=rate if converted else None,
+            fx_rate_version=rates.version if converted else None,
+            receiver_name=recipient_user.full_name,
+            receiver_account_number=recipient_wallet.wallet_number,
+            description=description,
+        )
+        pin_to_primary(request.user, recipient_user)
+        transaction_pk = transaction.pk
+        on_commit(lambda: velocity.record(request.user.id, recipient_wallet_number, base_amount, transaction_id=transaction_pk))
+
+        return Response({
+            'message': f'Transferred {amount} {currency} to {recipient_user.full_name} ({recipient_wallet_number}) successfully.',
+            'balance': sender_balance.balance if sender_balance is not None else sender_wallet.balance,
+            'recipient_name': recipient_user.full_name,
+            'transaction_id': transaction.transaction_id,
+            'amount': amount,
+            'currency': currency,
+            'received_amount': received_amount,
+            'received_currency': recipient_wallet.currency,
+            'fx_rate': transaction.fx_rate,
+            'timestamp': transaction.timestamp
+        }, status=status.HTTP_200_OK)
+
+class BatchVerifyView(APIView):
+    permission_classes = [IsAuthenticated]
+    # Each call resolves up to WALLET_VERIFY_BATCH_LIMIT numbers to names, so
+    # it is rate limited per user to keep the directory from being enumerated.
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'wallet_verify'
+
+    def post(self, request):
+        serializer = BatchVerifySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        wallet_numbers = serializer.validated_data['wallet_numbers']
+        recipients = directory.lookup_many(wallet_numbers)
+        results = [
+            {
+                'wallet_number': number,
+                'found': recipients[number] is not None,
+                'recipient_name': recipients[number][1] if recipients[number] else None,
+            }
+            for number in wallet_numbers
+        ]
+        return Response({'results': results}, status=status.HTTP_200_OK)
 
 class TransactionListView(generics.ListAPIView):
     serializer_class = TransactionSerializer
@@ -140,13 +296,53 @@ class TransactionListView(generics.ListAPIView):
         user = self.request.user
         transaction_type = self.request.query_params.get('type', None)
 
-        queryset = Transaction.objects.filter(Q(sender=user) | Q(receiver=user)).order_by('-timestamp')
+        queryset = Transaction.objects.filter(Q(sender=user) | Q(receiver=user)).select_related('sender', 'receiver').order_by('-timestamp')
+
+        # Bounding by month lets MySQL prune to the matching partitions.
+        start, end = history_bounds(self.request)
+        if start is not None:
+            queryset = queryset.filter(timestamp__gte=start)
+        if end is not None:
+            queryset = queryset.filter(timestamp__lt=end)
 
-        if transaction_type in ['incoming', 'outgoing']:
-            queryset = queryset.filter(transaction_type=transaction_type)
+        if transaction_type == 'incoming':
+            queryset = queryset.filter(receiver=user, kind='transfer')
+        elif transaction_type == 'outgoing':
+            queryset = queryset.filter(sender=user, kind='transfer')
 
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        archived = self.get_archived(request, {item['transaction_id'] for item in response.data})
+        if archived:
+            response.data = sorted(list(response.data) + archived, key=lambda item: item['timestamp'], reverse=True)
+        return response
+
+    def get_archived(self, request, live_ids):
+        """
+        Archived rows for every requested month older than the live window.
+
+        A month whose drop was interrupted is still in the live table as well,
+        so rows already listed from it are skipped.
+        """
+        start, end = history_bounds(request)
+        transaction_type = request.query_params.get('type', None)
+        cutoff = live_cutoff()
+        timestamp_field = serializers.DateTimeField()
+        records = []
+        for month in archived_months(Transaction):
+            if month >= cutoff or (start is not None and month < start) or (end is not None and month >= end):
+                continue
+            for item in archived_transactions(request.user, month):
+                if item['transaction_id'] in live_ids:
+                    continue
+                if transaction_type in ['incoming', 'outgoing'] and item['transaction_direction'] != transaction_type:
+                    continue
+                item['timestamp'] = timestamp_field.to_representation(item['timestamp'])
+                records.append(item)
+        return records
+
     def get_serializer(self, *args, **kwargs):
         kwargs['context'] = self.get_serializer_context()
         return self.serializer_class(*args, **kwargs)
@@ -164,68 +360,16 @@ class TransactionDetailView(generics.RetrieveAPIView):
 class ChatBotView(APIView):
     permission_classes = [IsAuthenticated]
 
-    system_prompt = """
-You are AfriTrade Advisor — a friendly, multilingual assistant dedicated to helping people across Africa understand and succeed in cross-border trade.
-
-🧭 Your Mission:
-You guide users—whether they are complete beginners, have limited literacy, or are experienced traders—step by step through exporting and importing goods between African countries.
-
-✅ Core Responsibilities:
-1. Explain everything in **clear, friendly, simple language**. Speak like you're helping a friend who is doing this for the first time. Avoid technical terms. Use analogies or examples when helpful.
-
-2. Break down every process into **clear steps**:
-   - What documents are needed.
-   - Where to get those documents (with links).
-   - Which government agencies to contact (with links to official websites).
-   - How much each step may cost (mention fees if known).
-   - How long it may take.
-   - What common mistakes to avoid.
-
-3. Include **official links** for:
-   - Government trade portals
-   - Certification agencies
-   - Customs offices
-   - Application forms (with clear instructions on how to fill them)
-   - Trade agreements (AfCFTA, ECOWAS, national laws)
-
-4. **Always explain each link**:
-   - What the website or form is for.
-   - What the user should do once they open the link.
-   - Step-by-step help for downloading or submitting forms.
-   - If the link is to a portal, explain how to register, login, and navigate.
-
-5. If the user doesn't mention the product or countries involved:
-   - Kindly ask them to specify the **origin country**, **destination country**, and the **type of goods** they want to export or import.
-   - Then proceed with the most accurate and helpful guidance.
-
-6. For every answer, be:
-   - Supportive and positive, like a mentor or friend.
-   - Patient and detailed.
-   - Focused on **empowering the user** to take action.
-
-7. Do not just refer users to another site. **You must summarize and explain** what they’ll find and do on that site.
-
-8. If web search is available, always provide the most recent and locally relevant information. If not, clarify to the user that your information is based on the latest known standards.
-
-🎯 Example Style:
-Instead of saying: "Visit the Kenya Trade Portal for more information."
-Say: 
-"Go to the Kenya Trade Portal at [https://www.kentrade.go.ke/](https://www.kentrade.go.ke). Once there:
-- Click on 'Trade Procedures'.
-- Select ‘Export’ or ‘Import’.
-- You’ll see a step-by-step list of what you need to do.
-For example, if exporting dried hibiscus, choose 'Agricultural Products' to see required forms like the Phytosanitary Certificate."
-
-🌍 Language & Inclusivity:
-Always be respectful and inclusive. Use local terms or translations where needed. Assume no prior knowledge of trade. Make the user feel confident and capable.
-
-You are a patient, smart, and kind assistant. Your job is not just to inform—but to **empower**.
-"""
-
+    # The prompt text lives in accounts/prompts/<prompt_name>.txt.
+    prompt_name = "afritrade-advisor"
 
     OPENROUTER_API_KEY = ""
     OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
 
+    @property
+    def system_prompt(self):
+        return prompts.load(self.prompt_name)
+
     def post(self, request):
         serializer = ChatPromptSerializer(data=request.data)
         if not serializer.is_valid():
@@ -241,13 +385,20 @@ You are a patient, smart, and kind assistant. Your job is not just to inform—b
             except ChatSession.DoesNotExist:
                 return Response({"error": "Chat session not found."}, status=status.HTTP_404_NOT_FOUND)
         else:
-            chat_session = ChatSession.objects.create(user=user)
+            prompt_template = PromptTemplate.objects.get_for_content(self.prompt_name, self.system_prompt)
+            chat_session = ChatSession.objects.create(user=user, prompt=prompt_template)
+
+        # Sessions keep the prompt version they were started with.
+        if chat_session.prompt_id:
+            system_prompt = PromptTemplate.objects.get_cached(chat_session.prompt_id).content
+        else:
+            system_prompt = self.system_prompt
 
         # Save user message
         ChatMessage.objects.create(chat_session=chat_session, role='user', content=prompt)
 
         # Build messages list for API call
-        messages = [{"role": "system", "content": self.system_prompt}]
+        messages = [{"role": "system", "content": system_prompt}]
         previous_messages = chat_session.messages.order_by('timestamp')
         for msg in previous_messages:
             messages.append({"role": msg.role, "content": msg.content})
@@ -263,6 +414,9 @@ You are a patient, smart, and kind assistant. Your job is not just to inform—b
             "Content-Type": "application/json"
         }
 
+        # Imported here so workers that never chat don't pay for it at startup.
+        import requests
+
         try:
             response = requests.post(self.OPENROUTER_URL, headers=headers, json=payload, timeout=30)
             response.raise_for_status()
@@ -271,6 +425,7 @@ You are a patient, smart, and kind assistant. Your job is not just to inform—b
 
             # Save assistant reply
             ChatMessage.objects.create(chat_session=chat_session, role='assistant', content=assistant_reply)
+            pin_to_primary(user)
 
             return Response({
                 "reply": assistant_reply,
@@ -285,5 +440,44 @@ class ChatSessionListView(APIView):
     def get(self, request):
         user = request.user
         chat_sessions = ChatSession.objects.filter(user=user).order_by('-updated_at')
+        start, end = history_bounds(request)
+        if start is not None:
+            chat_sessions = chat_sessions.filter(updated_at__gte=start)
+        if end is not None:
+            chat_sessions = chat_sessions.filter(updated_at__lt=end)
+        # Messages get the same bounds, so the read stays within the month partitions.
+        messages = ChatMessage.objects.order_by('timestamp')
+        if start is not None:
+            messages = messages.filter(timestamp__gte=start)
+        if end is not None:
+            messages = messages.filter(timestamp__lt=end)
+        chat_sessions = chat_sessions.prefetch_related(Prefetch('messages', queryset=messages))
         serializer = ChatSessionSerializer(chat_sessions, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+class SearchView(APIView):
+    """
+    ``GET ?q=words[&kind=message|transaction][&page=N][&page_size=N]``: the
+    user's chat messages and transactions containing every word, best match
+    first, with highlighted snippets.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        serializer = SearchQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        page_size = params.get('page_size', settings.SEARCH_PAGE_SIZE)
+        results, has_next = search.search(
+            request.user, params['q'], kind=params.get('kind'), page=params['page'], page_size=page_size,
+        )
+        timestamp_field = serializers.DateTimeField()
+        for result in results:
+            result['timestamp'] = timestamp_field.to_representation(result['timestamp'])
+        return Response({
+            'query': params['q'],
+            'page': params['page'],
+            'page_size': page_size,
+            'has_next': has_next,
+            'results': results,
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,92 @@
+"""
+Primary/replica database routing.
+
+Writes always go to ``default``. Reads go to the ``replica`` alias only while
+a request for one of ``settings.READ_REPLICA_VIEWS`` is being handled, and only
+when the requesting user has not written recently (read-your-writes).
+"""
+from asgiref.local import Local
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+REPLICA_ALIAS = 'replica'
+
+_state = Local()
+
+
+def _pin_key(user_id):
+    return f'db:pinned:{user_id}'
+
+
+def pin_to_primary(*users):
+    """Keep reads for ``users`` on the primary for READ_YOUR_WRITES_SECONDS."""
+    timeout = settings.READ_YOUR_WRITES_SECONDS
+    if timeout <= 0:
+        return
+    cache.set_many({_pin_key(user.pk): True for user in users if user is not None}, timeout)
+
+
+def is_pinned_to_primary(user_id):
+    return cache.get(_pin_key(user_id)) is not None
+
+
+def replica_enabled():
+    return REPLICA_ALIAS in connections.databases
+
+
+def _token_user_id(request):
+    # Read the user id straight from the access token so routing is decided
+    # before DRF authenticates (which would otherwise query the primary).
+    parts = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(parts) != 2 or parts[0] not in api_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        token = AccessToken(parts[1])
+    except TokenError:
+        return None
+    return token.get(api_settings.USER_ID_CLAIM)
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.replica_views = frozenset(settings.READ_REPLICA_VIEWS)
+
+    def __call__(self, request):
+        _state.use_replica = False
+        try:
+            return self.get_response(request)
+        finally:
+            _state.use_replica = False
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not replica_enabled() or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            return None
+        view_class = getattr(view_func, 'view_class', None)
+        if view_class is None or view_class.__name__ not in self.replica_views:
+            return None
+        user_id = _token_user_id(request)
+        if user_id is not None and not is_pinned_to_primary(user_id):
+            _state.use_replica = True
+        return None
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if getattr(_state, 'use_replica', False) and replica_enabled():
+            return REPLICA_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica mirrors the primary, so objects from either are related.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
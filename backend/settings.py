@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -31,7 +32,8 @@ ALLOWED_HOSTS = ['*']
 # Application definition
 
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    # Without autodiscovery; backend/urls.py loads admin modules with the URLconf.
+    'django.contrib.admin.apps.SimpleAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -45,6 +47,9 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    'DEFAULT_THROTTLE_RATES': {
+        'wallet_verify': os.environ.get('WALLET_VERIFY_RATE', '10/minute'),
+    },
 }
 
 MIDDLEWARE = [
@@ -55,6 +60,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'backend.db_router.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -81,20 +87,75 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'paybridge$default',
-        'USER': 'paybridge',
-        'PASSWORD': 'Jesus15lord!',
-        'HOST': 'paybridge.mysql.pythonanywhere-services.com',
-        'PORT': '3306',
-        'OPTIONS': {
+def _database(prefix, default_host):
+    """Build a DATABASES entry from ``<prefix>_*`` environment variables."""
+    engine = os.environ.get(f'{prefix}_ENGINE', 'django.db.backends.mysql')
+    config = {
+        'ENGINE': engine,
+        'NAME': os.environ.get(f'{prefix}_NAME', 'paybridge$default'),
+        'USER': os.environ.get(f'{prefix}_USER', 'paybridge'),
+        'PASSWORD': os.environ.get(f'{prefix}_PASSWORD', 'Jesus15lord!'),
+        'HOST': os.environ.get(f'{prefix}_HOST', default_host),
+        'PORT': os.environ.get(f'{prefix}_PORT', '3306'),
+        # Keep connections open between requests instead of reconnecting to
+        # the remote host every time; CONN_HEALTH_CHECKS drops dead ones.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '300')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+    }
+    if engine == 'django.db.backends.mysql':
+        config['OPTIONS'] = {
             'charset': 'utf8mb4',
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
-        },
+            'connect_timeout': 5,
+        }
+    elif engine == 'django.db.backends.postgresql' and os.environ.get('DB_POOL', '') == '1':
+        # psycopg 3 ships a native pool; it replaces persistent connections.
+        config['CONN_MAX_AGE'] = 0
+        config['OPTIONS'] = {'pool': True}
+    return config
+
+
+DATABASES = {
+    'default': _database('DB', 'paybridge.mysql.pythonanywhere-services.com'),
+}
+
+# Read replicas are optional. Set DB_REPLICA_HOST (and any other DB_REPLICA_*
+# overrides) to enable routing of read-only views to a replica.
+if os.environ.get('DB_REPLICA_HOST') or os.environ.get('DB_REPLICA_NAME'):
+    DATABASES['replica'] = _database('DB_REPLICA', os.environ.get('DB_REPLICA_HOST', ''))
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+# The cache backs read-your-writes pins and the wallet directory, so it must
+# be shared between workers in production
+# (e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache).
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
+CACHE_IS_LOCAL = CACHES['default']['BACKEND'] == 'django.core.cache.backends.locmem.LocMemCache'
+if CACHE_IS_LOCAL:
+    # Only the local-memory backend takes MAX_ENTRIES; the Redis and
+    # memcached clients reject unknown options.
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', '100000'))}
+
+DATABASE_ROUTERS = ['backend.db_router.PrimaryReplicaRouter']
+
+# Views whose queries may be served by a replica.
+READ_REPLICA_VIEWS = [
+    'TransactionListView',
+    'TransactionDetailView',
+    'ChatSessionListView',
+    'SearchView',
+    'UserInfoView',
+    'WalletInfoView',
+]
+
+# After a user writes (e.g. a transfer) their reads stay on the primary for
+# this many seconds so they never see stale balances or history.
+READ_YOUR_WRITES_SECONDS = int(os.environ.get('READ_YOUR_WRITES_SECONDS', '10'))
 
 
 # Password validation
@@ -130,7 +191,6 @@ USE_TZ = True
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.1/howto/static-files/
-import os
 
 STATIC_URL = "/static/"
 
@@ -144,6 +204,87 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Time partitioning and archival of Transaction / ChatMessage.
+# Months older than PARTITION_LIVE_MONTHS are moved to ARCHIVE_ROOT by
+# `manage.py archive_partitions`.
+PARTITION_LIVE_MONTHS = int(os.environ.get('PARTITION_LIVE_MONTHS', '12'))
+
+PARTITION_MONTHS_AHEAD = 3
+
+ARCHIVE_ROOT = os.environ.get('ARCHIVE_ROOT', os.path.join(BASE_DIR, 'archive'))
+
+ARCHIVE_BATCH_SIZE = 2000
+
+# Chat transcript compression ('zstd' falls back to 'zlib' when the
+# zstandard package is not installed). Train dictionaries with
+# `manage.py train_chat_dictionary`.
+CHAT_COMPRESSION_CODEC = os.environ.get('CHAT_COMPRESSION_CODEC', 'zstd')
+
+CHAT_COMPRESSION_LEVEL = 3
+
+CHAT_COMPRESSION_MIN_SIZE = 64
+
+CHAT_COMPRESSION_DICTIONARY_TTL = 300
+
+# Transfer velocity rules, evaluated in memory per worker before a transfer
+# takes any row locks. Limits apply over a sliding VELOCITY_WINDOW_SECONDS.
+VELOCITY_RULES = {
+    'max_transfers_per_window': 30,
+    'max_amount_per_window': 5000000,
+    'max_new_recipients_per_window': 10,
+    'max_incoming_per_recipient_per_window': 500,
+}
+
+VELOCITY_WINDOW_SECONDS = 3600
+
+VELOCITY_BUCKETS = 12
+
+VELOCITY_SYNC_SECONDS = 5
+
+# How far behind the previous sync each sync re-reads, to catch transfers
+# that committed late; must exceed the longest transfer transaction.
+VELOCITY_SYNC_MARGIN_SECONDS = 60
+
+VELOCITY_KNOWN_RECIPIENT_DAYS = 90
+
+# Cached wallet number -> recipient name lookups for transfer verification.
+# Name changes are written through to the cache, but a per-process cache only
+# sees its own worker's writes, so entries there expire within a minute.
+WALLET_DIRECTORY_TTL = int(os.environ.get('WALLET_DIRECTORY_TTL', 60 if CACHE_IS_LOCAL else 24 * 3600))
+
+WALLET_DIRECTORY_NEGATIVE_TTL = 60
+
+WALLET_VERIFY_BATCH_LIMIT = 100
+
+# Balance reconciliation checkpoints at the newest transaction at least this
+# old; must exceed the longest transfer transaction, so no transfer with a
+# lower id is still uncommitted when a run reads the ledger.
+RECONCILE_SETTLE_SECONDS = 60
+
+# Currencies and FX. Wallet balances are held in DEFAULT_CURRENCY unless a
+# wallet was opened in another one; cross-currency transfers are priced from
+# the rate table in FX_RATES_FILE, reloaded every FX_REFRESH_SECONDS.
+DEFAULT_CURRENCY = os.environ.get('DEFAULT_CURRENCY', 'NGN')
+
+FX_RATES_FILE = os.environ.get('FX_RATES_FILE', os.path.join(BASE_DIR, 'accounts', 'fx_rates.json'))
+
+FX_REFRESH_SECONDS = 60
+
+# Full-text search over chat messages and transactions. 'auto' uses SQLite
+# FTS5 or MySQL FULLTEXT where available and term postings otherwise ('fts5',
+# 'mysql' or 'python' to force one). Re-run `manage.py rebuild_search_index`
+# after changing it.
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto')
+
+SEARCH_PAGE_SIZE = 20
+
+SEARCH_MAX_PAGE_SIZE = 50
+
+SEARCH_SNIPPET_WORDS = 24
+
+# API-only workers can set ADMIN_ENABLED=0 to skip loading the admin site.
+ADMIN_ENABLED = os.environ.get('ADMIN_ENABLED', '1') == '1'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
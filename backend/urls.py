@@ -14,10 +14,16 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.conf import settings
 from django.urls import path, include
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('api/auth/', include('accounts.urls')),
 ]
+
+if settings.ADMIN_ENABLED:
+    # The admin app is installed without autodiscovery, so ModelAdmin modules
+    # load with the URLconf instead of during app start-up.
+    from django.contrib import admin
+    admin.autodiscover()
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
@@ -0,0 +1,19 @@
+"""
+Gunicorn settings.
+
+The app is loaded once in the master (``preload_app``) and warmed up before
+any worker forks, so workers start ready to serve and share the imported
+code and read-only state copy-on-write instead of each loading their own.
+"""
+import multiprocessing
+import os
+
+wsgi_app = 'backend.wsgi:application'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+preload_app = True
+
+
+def on_starting(server):
+    from accounts.startup import warmup
+    warmup()